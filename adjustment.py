@@ -0,0 +1,87 @@
+"""
+本地复权计算
+只保存不复权K线和一张很小的复权因子表（仅在除权除息日变化），前/后复权价格按需向量化计算：
+- A股使用新浪后复权因子 h：后复权 = 原价 × h，前复权 = 原价 × h / h_最新
+- 美股(us2)使用新浪前复权因子 (f, c)：前复权 = 原价 × f + c
+因子在其日期及之后生效，直到下一个因子日期
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['开盘', '收盘', '最高', '最低', 'open', 'high', 'low', 'close']
+
+
+def normalize_factors(df: pd.DataFrame, kind: str) -> Optional[pd.DataFrame]:
+    """
+    把 stock_zh_a_daily(adjust='hfq-factor') / stock_us_daily(adjust='qfq-factor') 的结果
+    统一为按日期升序的 ['日期', 'factor', 'offset'] 表
+    """
+    if df is None or df.empty or 'date' not in df.columns:
+        return None
+    factor_col = f'{kind}_factor'
+    out = pd.DataFrame({
+        '日期': pd.to_datetime(df['date']),
+        'factor': pd.to_numeric(df[factor_col], errors='coerce'),
+        'offset': pd.to_numeric(df['adjust'], errors='coerce') if 'adjust' in df.columns else 0.0,
+    })
+    out = out.dropna(subset=['日期', 'factor'])
+    out = out.sort_values('日期', kind='stable').drop_duplicates('日期', keep='last')
+    return out.reset_index(drop=True)
+
+
+def _factor_at(factors: pd.DataFrame, dates: np.ndarray):
+    """每个日期生效的 (factor, offset)；早于第一个因子日期的K线使用第一个因子"""
+    pos = factors['日期'].values.searchsorted(dates, side='right') - 1
+    pos = np.clip(pos, 0, len(factors) - 1)
+    return factors['factor'].values[pos], factors['offset'].values[pos]
+
+
+def apply_adjustment(raw: pd.DataFrame, factors: pd.DataFrame, kind: str, adjust: str) -> pd.DataFrame:
+    """
+    由不复权K线计算复权K线（返回新DataFrame，不修改 raw）
+
+    Args:
+        raw: 含 '日期' 列、按日期升序的不复权K线
+        factors: normalize_factors 的结果
+        kind: 因子类型，'hfq'（A股）或 'qfq'（us2）
+        adjust: 'qfq' / 'hfq'
+    """
+    if raw is None or raw.empty or factors is None or factors.empty:
+        return raw
+    if kind == 'qfq' and adjust != 'qfq':
+        raise ValueError(f"{kind} 因子不支持复权类型: {adjust}")
+
+    dates = raw['日期'].values
+    factor, offset = _factor_at(factors, dates)
+    if kind == 'hfq' and adjust == 'qfq':
+        factor = factor / factors['factor'].values[-1]
+        offset = np.zeros_like(factor)
+
+    out = raw.copy()
+    for col in out.columns.intersection(PRICE_COLUMNS):
+        out[col] = out[col].values.astype('float64') * factor + offset
+
+    # 涨跌额/涨跌幅/振幅 按复权后的前收盘重新计算；首行的前收盘取 (收盘 - 涨跌额) 按前一日因子复权
+    if '收盘' in out.columns:
+        close = out['收盘'].values
+        prev_close = np.empty_like(close)
+        prev_close[1:] = close[:-1]
+        if len(close) and '涨跌额' in raw.columns:
+            f0, c0 = _factor_at(factors, dates[:1] - np.timedelta64(1, 'D'))
+            f0, c0 = f0[0], c0[0]
+            if kind == 'hfq' and adjust == 'qfq':
+                f0, c0 = f0 / factors['factor'].values[-1], 0.0
+            prev_close[0] = (raw['收盘'].values[0] - raw['涨跌额'].values[0]) * f0 + c0
+        elif len(close):
+            prev_close[0] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if '涨跌额' in out.columns:
+                out['涨跌额'] = close - prev_close
+            if '涨跌幅' in out.columns:
+                out['涨跌幅'] = (close / prev_close - 1.0) * 100.0
+            if '振幅' in out.columns and '最高' in out.columns and '最低' in out.columns:
+                out['振幅'] = (out['最高'].values - out['最低'].values) / prev_close * 100.0
+    return out
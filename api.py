@@ -1,25 +1,304 @@
-import akshare as ak
+from __future__ import annotations
+
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Callable, Dict, List, Optional, Union
 import warnings
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 #from tqdm import tqdm
-import requests # Added for Alpha Vantage API calls
 import json # Added for Alpha Vantage API calls
+import numpy as np
+from lazy_import import LazyModule
+from frame_schema import format_ohlcv_frame
+from rate_limiter import get_rate_limiter
+from local_store import (LocalBarStore, DEFAULT_STORE_DIR, merge_ranges, missing_ranges, range_covered,
+                         read_json, settled_date, slice_dates, stable_end_date, write_json)
+from resample import PERIOD_FREQ, period_start, resample_bars
+from adjustment import apply_adjustment, normalize_factors
+from providers import DataProvider, get_http_session, get_provider
+from indicator_cache import cached_indicator
 
 warnings.filterwarnings('ignore')
+
+# requests 在第一次请求时才导入；akshare 与 HTTP 调用经由 providers.DataProvider（支持录制/回放）
+requests = LazyModule('requests') # Alpha Vantage API calls
 #tqdm.disable = True
 
+# Alpha Vantage 配置（可用环境变量覆盖，测试时可把 URL 指向本地桩服务）
+alpha_api = os.environ.get('ALPHA_VANTAGE_API_KEY', 'YOUR_ALPHA_VANTAGE_API_KEY')
+ALPHA_VANTAGE_URL = os.environ.get('ALPHA_VANTAGE_URL', 'https://www.alphavantage.co/query')
+
+# 可由 不复权K线 + 新浪复权因子 本地计算的 (市场, 复权类型)；
+# 美股 us 使用 eastmoney 的 secid 行情，与新浪因子不是同一数据源，仍按复权类型分别获取
+ADJUST_FACTOR_SOURCES = {
+    ('sh', 'qfq'), ('sh', 'hfq'), ('sz', 'qfq'), ('sz', 'hfq'), ('cyb', 'qfq'), ('cyb', 'hfq'),
+    ('us2', 'qfq'),
+}
+ADJUST_FACTOR_PREFIX = {'sh': 'sh', 'sz': 'sz', 'cyb': 'sz'}
+
+# 按天刷新的缓存以"数据已发布的日期"为准（北京时间，小时）：指数日线收盘后发布，基金净值/名单晚间发布
+INDEX_PUBLISH_HOUR = 16
+FUND_PUBLISH_HOUR = 22
+
+
+class MarketSnapshotCache:
+    """
+    进程内共享的全市场实时行情快照
+    每个市场只保留一份快照：ttl 内直接使用；过期但未超过 max_stale 时先返回旧快照，
+    同时在后台刷新（stale-while-revalidate）；更旧或不存在时同步加载。
+    快照按 '代码' 建立哈希索引，单只/批量查询都不再扫描全表
+    """
+
+    def __init__(self, ttl: float = 30.0, max_stale: float = 300.0):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._snapshots: Dict[str, tuple] = {}   # group -> (加载时间, DataFrame, 代码索引)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _build_index(df: pd.DataFrame) -> Dict[str, int]:
+        codes = df['代码'].astype(str).tolist()
+        index = {}
+        # 美股代码形如 '105.AAPL'，同时允许用不带前缀的代码查询（BRK.B 这类代码本身的点保留）
+        for pos, code in enumerate(codes):
+            head, _, tail = code.partition('.')
+            index.setdefault(tail if head.isdigit() and tail else code, pos)
+        for pos, code in enumerate(codes):
+            index[code] = pos
+        return index
+
+    def _load(self, group: str, loader: Callable[[], pd.DataFrame]) -> tuple:
+        with self._lock:
+            load_lock = self._load_locks.setdefault(group, threading.Lock())
+        with load_lock:
+            entry = self._snapshots.get(group)
+            # 等锁期间其他线程可能已完成加载
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                return entry
+            df = loader()
+            entry = (time.monotonic(), df.reset_index(drop=True), self._build_index(df))
+            self._snapshots[group] = entry
+            return entry
+
+    def _refresh_in_background(self, group: str, loader: Callable[[], pd.DataFrame]) -> None:
+        with self._lock:
+            if group in self._refreshing:
+                return
+            self._refreshing.add(group)
+
+        def run():
+            try:
+                self._load(group, loader)
+            except Exception as e:
+                print(f"后台刷新行情快照失败: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(group)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get(self, group: str, loader: Callable[[], pd.DataFrame]) -> tuple:
+        """返回 (DataFrame, 代码索引)"""
+        entry = self._snapshots.get(group)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                return entry[1], entry[2]
+            if age < self.max_stale:
+                self._refresh_in_background(group, loader)
+                return entry[1], entry[2]
+        entry = self._load(group, loader)
+        return entry[1], entry[2]
+
+
+# 全进程共享，可通过 market_snapshots.ttl / market_snapshots.max_stale 调整
+market_snapshots = MarketSnapshotCache()
+
+# 基金代码 -> 简称（全进程共享，按发布日刷新）：(发布日, 映射)
+_fund_names: Optional[tuple] = None
+_fund_names_lock = threading.Lock()
+
+
+
+class SingleFlight:
+    """
+    请求合并：同一 key 的并发调用只有第一个真正执行，其余调用等待并共享其结果
+    （结果为 DataFrame 时，每个调用方都拿到各自的对象：执行者拿原结果，等待者拿私有副本的副本，
+    调用方原地修改互不影响）
+    """
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+            self.waiters = 0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[tuple, 'SingleFlight._Call'] = {}
+
+    def do(self, key: tuple, fn: Callable):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+        if leader:
+            result = None
+            try:
+                result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                    waiters = call.waiters
+                # 在唤醒等待者之前保存私有副本，执行者之后对 result 的修改不会影响等待者
+                if waiters and isinstance(result, pd.DataFrame):
+                    call.result = result.copy()
+                else:
+                    call.result = result
+                call.event.set()
+            if call.error is not None:
+                raise call.error
+            return result
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        if isinstance(call.result, pd.DataFrame):
+            return call.result.copy()
+        return call.result
+
+
+# 全进程共享，多个 Streamlit 会话同时请求同一数据时只访问一次数据源
+_inflight = SingleFlight()
+
+
+class RecentFetches:
+    """
+    短期记录刚从数据源获取过的未稳定区间（通常是当天K线）：stable_end_date 不会把当天记为已覆盖，
+    在 ttl 秒内再次请求（切换周期、复权方式）时把这些区间当作已覆盖，过期后才重新请求数据源
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ranges: Dict[tuple, List[tuple]] = {}
+
+    def add(self, key: tuple, start_date: str, end_date: str) -> None:
+        with self._lock:
+            self._ranges.setdefault(key, []).append((time.monotonic(), start_date, end_date))
+
+    def ranges(self, key: tuple) -> List[List[str]]:
+        """key 下仍在有效期内的区间（顺带清理过期记录）"""
+        now = time.monotonic()
+        with self._lock:
+            live = [entry for entry in self._ranges.get(key, []) if now - entry[0] < self.ttl]
+            if live:
+                self._ranges[key] = live
+            else:
+                self._ranges.pop(key, None)
+            return [[start, end] for _, start, end in live]
+
+
+# 全进程共享，可通过 recent_fetches.ttl 调整当天K线的复用时长
+recent_fetches = RecentFetches()
+
+# eastmoney 美股 secid 前缀
+US_EXCHANGE_PREFIX = {'NASDAQ': '105', 'NYSE': '106', 'AMEX': '107'}
+TICKER_LIST_PATH = 'ticker_list.csv'
+
+
+class UsSecidResolver:
+    """
+    美股代码 -> eastmoney secid（如 '105.AAPL'）的解析缓存
+    已确认可用的 secid 持久化到 JSON；ticker_list.csv 的 market 列作为首选猜测
+    """
+
+    def __init__(self, path: Optional[str], ticker_list_path: str = TICKER_LIST_PATH):
+        self.path = path
+        self.ticker_list_path = ticker_list_path
+        self._resolved: Dict[str, str] = read_json(path, default={}) if path else {}
+        self._hints: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def _load_hints(self) -> Dict[str, str]:
+        if self._hints is None:
+            hints = {}
+            try:
+                tickers = pd.read_csv(self.ticker_list_path, usecols=['symbol', 'market'])
+                tickers = tickers.dropna()
+                prefixes = tickers['market'].map(US_EXCHANGE_PREFIX)
+                symbols = tickers['symbol'].astype(str).str.upper()
+                hints = {sym: f"{px}.{sym}" for sym, px in zip(symbols, prefixes) if isinstance(px, str)}
+            except Exception as e:
+                print(f"读取 {self.ticker_list_path} 失败: {e}")
+            self._hints = hints
+        return self._hints
+
+    def resolved(self, base: str) -> Optional[str]:
+        """已确认可用的 secid"""
+        return self._resolved.get(base)
+
+    def hint(self, base: str) -> Optional[str]:
+        """根据 ticker_list.csv 交易所推断的 secid"""
+        return self._load_hints().get(base)
+
+    def remember(self, base: str, secid: str) -> None:
+        with self._lock:
+            if self._resolved.get(base) == secid:
+                return
+            self._resolved[base] = secid
+            if self.path:
+                write_json(self._resolved, self.path)
+
+    def forget(self, base: str) -> None:
+        with self._lock:
+            if self._resolved.pop(base, None) is not None and self.path:
+                write_json(self._resolved, self.path)
+
+
+_secid_resolvers: Dict[Optional[str], UsSecidResolver] = {}
+
+
+def get_us_secid_resolver(path: Optional[str]) -> UsSecidResolver:
+    """同一缓存文件在进程内只加载一次"""
+    if path not in _secid_resolvers:
+        _secid_resolvers[path] = UsSecidResolver(path)
+    return _secid_resolvers[path]
+
 class StockDataAPI:
     """股票数据获取API类，支持上证、深证、创业板、美股数据获取"""
     
-    def __init__(self):
+    def __init__(self, store_dir: Optional[str] = DEFAULT_STORE_DIR, compact: bool = False,
+                 provider: Optional[DataProvider] = None):
+        """
+        Args:
+            store_dir: 本地行情存储目录，传入 None 则每次都直接请求数据源
+            compact: 是否使用紧凑列类型（float32 价格、整数成交量、category 市场列）
+            provider: 数据源访问层（live/record/replay），默认按 STOCK_PROVIDER_* 环境变量创建
+        """
         self.market_mapping = {
             'sh': '上证',  # 上海证券交易所
             'sz': '深证',  # 深圳证券交易所  
             'cyb': '创业板',  # 创业板
             'us': '美股'   # 美国股市
         }
+        self.compact = compact
+        self.provider = provider if provider is not None else get_provider()
+        self.alpha_vantage_url = ALPHA_VANTAGE_URL
+        self.store = LocalBarStore(store_dir) if store_dir else None
+        self.us_secids = get_us_secid_resolver(os.path.join(store_dir, 'us_secid.json') if store_dir else None)
     
     def get_stock_data(self, 
                       symbol: str, 
@@ -54,24 +333,203 @@ class StockDataAPI:
             else:
                 end_date = end_date.replace('-', '')
             
-            # 根据市场类型获取数据
-            if market == 'sh':
-                return self._get_shanghai_data(symbol, start_date, end_date, period, adjust)
-            elif market == 'sz':
-                return self._get_shenzhen_data(symbol, start_date, end_date, period, adjust)
-            elif market == 'cyb':
-                return self._get_chinext_data(symbol, start_date, end_date, period, adjust)
-            elif market == 'us':
-                return self._get_us_data(symbol, start_date, end_date, period, adjust)
-            elif market == 'us2':
-                return self._get_us_data_sn(symbol, adjust)
-            else:
-                raise ValueError(f"不支持的市场类型: {market}")
+            # 按规范化后的请求合并并发调用
+            key = ('stock_data', (symbol or '').strip().upper(), market, start_date, end_date, period, adjust,
+                   self.store.root if self.store is not None else None, self.compact)
+            return _inflight.do(key, lambda: self._get_stock_data(symbol, market, start_date, end_date, period, adjust))
                 
         except Exception as e:
             print(f"获取股票数据失败: {str(e)}")
             return None
-    
+
+    def _get_stock_data(self, symbol: str, market: str, start_date: str, end_date: str,
+                        period: str, adjust: str) -> Optional[pd.DataFrame]:
+        """有本地存储时读穿存储，否则直接请求数据源"""
+        if self.store is not None:
+            if period in PERIOD_FREQ:
+                df = self._get_resampled_data(symbol, market, start_date, end_date, period, adjust)
+            else:
+                df = self._get_daily_bars(symbol, market, start_date, end_date, adjust)
+            # 本地存储可能由另一种 compact 设置写入，统一为当前实例的列类型
+            return format_ohlcv_frame(df, compact=self.compact)
+        return self._fetch_stock_data(symbol, market, start_date, end_date, period, adjust)
+
+    def _fetch_stock_data(self, symbol: str, market: str, start_date: str, end_date: str,
+                          period: str, adjust: str) -> Optional[pd.DataFrame]:
+        """直接从数据源获取数据（日期格式：'YYYYMMDD'）"""
+        # 根据市场类型获取数据
+        if market == 'sh':
+            return self._get_shanghai_data(symbol, start_date, end_date, period, adjust)
+        elif market == 'sz':
+            return self._get_shenzhen_data(symbol, start_date, end_date, period, adjust)
+        elif market == 'cyb':
+            return self._get_chinext_data(symbol, start_date, end_date, period, adjust)
+        elif market == 'us':
+            return self._get_us_data(symbol, start_date, end_date, period, adjust)
+        elif market == 'us2':
+            return self._get_us_data_sn(symbol, adjust)
+        else:
+            raise ValueError(f"不支持的市场类型: {market}")
+
+    def _get_daily_bars(self, symbol: str, market: str, start_date: str, end_date: str,
+                        adjust: str) -> Optional[pd.DataFrame]:
+        """
+        本地存储的日线：支持复权因子的市场只保存不复权K线，前/后复权由因子表本地计算，
+        切换复权方式不再重新下载；其余情况按复权类型分别缓存
+        """
+        if adjust and (market, adjust) in ADJUST_FACTOR_SOURCES:
+            factors, kind = self._get_adjust_factors(symbol, market)
+            if factors is not None:
+                raw = self._get_stock_data_cached(symbol, market, start_date, end_date, 'daily', '')
+                if raw is None or raw.empty or '日期' not in raw.columns:
+                    return raw
+                return apply_adjustment(raw, factors, kind, adjust)
+        return self._get_stock_data_cached(symbol, market, start_date, end_date, 'daily', adjust)
+
+    def _get_adjust_factors(self, symbol: str, market: str):
+        """
+        复权因子表（按 市场_代码 缓存，每天最多下载一次；获取失败也记录当天已检查，不重复请求）。
+        返回 (因子表, 因子类型)，获取失败且无缓存时因子表为 None
+        """
+        key = f"{market}_{(symbol or '').strip().upper()}"
+        cached, meta = self.store.load_table('factors', key)
+        today = datetime.now().strftime('%Y%m%d')
+        kind = 'qfq' if market == 'us2' else 'hfq'
+        has_cached = cached is not None and not cached.empty
+        if meta.get('checked_on') == today:
+            # 当天已检查过（包括获取失败的情况），不再重复请求数据源
+            return (cached, meta.get('kind', kind)) if has_cached else (None, kind)
+
+        sina_symbol = f"{ADJUST_FACTOR_PREFIX[market]}{symbol}" if market in ADJUST_FACTOR_PREFIX else symbol
+        try:
+            if market == 'us2':
+                raw_factors = self.provider.stock_us_daily(symbol=sina_symbol, adjust='qfq-factor')
+            else:
+                raw_factors = self.provider.stock_zh_a_daily(symbol=sina_symbol, adjust='hfq-factor')
+            fetched = normalize_factors(raw_factors, kind)
+        except Exception as e:
+            print(f"获取复权因子失败 {key}: {e}")
+            fetched = None
+        if fetched is None or fetched.empty:
+            # 记住当天的失败，之后的请求直接使用旧因子表或回退到按复权类型获取
+            if has_cached:
+                kind = meta.get('kind', kind)
+            else:
+                cached = pd.DataFrame(columns=['日期', 'factor', 'offset'])
+            self.store.save_table('factors', key, cached, {'checked_on': today, 'kind': kind, 'failed': True})
+            return (cached, kind) if has_cached else (None, kind)
+        self.store.save_table('factors', key, fetched, {'checked_on': today, 'kind': kind})
+        return fetched, kind
+
+    def _get_resampled_data(self, symbol: str, market: str, start_date: str, end_date: str,
+                            period: str, adjust: str) -> Optional[pd.DataFrame]:
+        """
+        周线/月线由本地日线合成：日线区间向前扩展到首个周期的第一天，保证首根K线完整，
+        切换周期时只做内存聚合，不再单独请求数据源
+        """
+        daily = self._get_daily_bars(symbol, market, period_start(start_date, period), end_date, adjust)
+        if daily is None or daily.empty or '日期' not in daily.columns:
+            return daily
+        return slice_dates(resample_bars(daily, period), start_date, end_date)
+
+    def _get_stock_data_cached(self, symbol: str, market: str, start_date: str, end_date: str,
+                               period: str, adjust: str) -> Optional[pd.DataFrame]:
+        """
+        读穿本地存储：请求区间已被覆盖时直接返回本地数据，
+        否则只向数据源请求缺失的头部/尾部区间，拼接后入库。
+        日线缺口向前扩展到起始日所在周/月的第一天，之后由同一区间合成周线/月线时不再产生头部缺口；
+        刚获取过的当天K线在 recent_fetches 有效期内也视为已覆盖
+        """
+        cached, coverage = self.store.load(market, symbol, period, adjust)
+        recent_key = (self.store.root, market, (symbol or '').strip().upper(), period, adjust)
+        known = merge_ranges(coverage + recent_fetches.ranges(recent_key)) if cached is not None else []
+        if cached is not None and range_covered(known, start_date, end_date):
+            return slice_dates(cached, start_date, end_date)
+
+        fetch_from = start_date
+        if period == 'daily' and market != 'us2':
+            fetch_from = min(period_start(start_date, 'weekly'), period_start(start_date, 'monthly'))
+
+        if market == 'us2':
+            # stock_us_daily 不支持日期参数，一次返回全部历史
+            segments = [['19000101', end_date]]
+        elif period != 'daily' or cached is None or cached.empty:
+            # 周线/月线在区间边界会产生不完整的K线，只能整段获取（有本地存储时周线/月线由日线合成，不走这里）
+            segments = [[fetch_from, end_date]]
+        else:
+            segments = missing_ranges(known, fetch_from, end_date)
+
+        pieces = []
+        fetched_segments = []
+        for seg_start, seg_end in segments:
+            fetch_start, fetch_end = seg_start, seg_end
+            if adjust == 'qfq' and period == 'daily' and cached is not None and not cached.empty and coverage:
+                # 前复权价格会随除权除息整体平移：多取一根相邻的已缓存K线用于校验
+                # （没有覆盖区间时，如只请求过当日或元数据丢失，本地K线不能作为基准，直接按缺失区间获取）
+                fetch_start, fetch_end = self._extend_to_cached_neighbors(cached, coverage, seg_start, seg_end)
+            piece = self._fetch_stock_data(symbol, market, fetch_start, fetch_end, period, adjust)
+            if (piece is None or piece.empty) and (cached is None or cached.empty):
+                return piece
+            if piece is None:
+                # 获取失败：不记为已覆盖，下次请求时重试
+                continue
+            fetched_segments.append([seg_start, seg_end])
+            if piece.empty or '日期' not in piece.columns:
+                continue
+            if fetch_start != seg_start or fetch_end != seg_end:
+                if not self._matches_cached(cached, piece):
+                    return self._refetch_rebased(symbol, market, coverage, start_date, end_date, period, adjust)
+            pieces.append(piece)
+
+        new_coverage = list(coverage)
+        for seg_start, seg_end in fetched_segments:
+            stable_end = stable_end_date(seg_end)
+            if seg_start <= stable_end:
+                new_coverage.append([seg_start, stable_end])
+            if stable_end < seg_end:
+                recent_fetches.add(recent_key, seg_start, seg_end)
+        fetched = pd.concat(pieces, ignore_index=True) if pieces else cached.iloc[0:0]
+        combined = self.store.upsert(market, symbol, period, adjust, cached, fetched, new_coverage)
+        return slice_dates(combined, start_date, end_date)
+
+    def _extend_to_cached_neighbors(self, cached: pd.DataFrame, coverage, seg_start: str, seg_end: str):
+        """把缺失区间向两侧扩展到最近的已缓存交易日，使新旧数据至少重叠一根K线"""
+        # 覆盖区间之外的K线（如上次请求时尚未收盘的当日K线）不能作为校验基准
+        covered_end = pd.Timestamp(max(r[1] for r in coverage)).to_datetime64()
+        dates = cached['日期'].values
+        dates = dates[:dates.searchsorted(covered_end, side='right')]
+        lo = dates.searchsorted(pd.Timestamp(seg_start).to_datetime64(), side='left')
+        hi = dates.searchsorted(pd.Timestamp(seg_end).to_datetime64(), side='right')
+        fetch_start = pd.Timestamp(dates[lo - 1]).strftime('%Y%m%d') if lo > 0 else seg_start
+        fetch_end = pd.Timestamp(dates[hi]).strftime('%Y%m%d') if hi < len(dates) else seg_end
+        return fetch_start, fetch_end
+
+    def _matches_cached(self, cached: pd.DataFrame, piece: pd.DataFrame) -> bool:
+        """比较新旧数据重叠日期的收盘价，不一致说明复权基准已变化"""
+        close_col = '收盘' if '收盘' in piece.columns else 'close'
+        if close_col not in piece.columns or close_col not in cached.columns:
+            return True
+        overlap = pd.merge(cached[['日期', close_col]], piece[['日期', close_col]], on='日期')
+        if overlap.empty:
+            return True
+        diff = (overlap[f'{close_col}_x'] - overlap[f'{close_col}_y']).abs()
+        return bool((diff <= 1e-6 * overlap[f'{close_col}_y'].abs().clip(lower=1.0)).all())
+
+    def _refetch_rebased(self, symbol: str, market: str, coverage, start_date: str, end_date: str,
+                         period: str, adjust: str) -> Optional[pd.DataFrame]:
+        """复权基准变化后，重新获取整个已覆盖区间并替换本地数据"""
+        full_start = min([start_date] + [r[0] for r in coverage])
+        full_end = max([end_date] + [r[1] for r in coverage])
+        fetched = self._fetch_stock_data(symbol, market, full_start, full_end, period, adjust)
+        if fetched is None or fetched.empty or '日期' not in fetched.columns:
+            return fetched
+        new_coverage = []
+        stable_end = stable_end_date(full_end)
+        if full_start <= stable_end:
+            new_coverage.append([full_start, stable_end])
+        combined = self.store.upsert(market, symbol, period, adjust, None, fetched, new_coverage)
+        return slice_dates(combined, start_date, end_date)
+
     def _get_shanghai_data(self, symbol: str, start_date: str, end_date: str, 
                           period: str, adjust: str) -> pd.DataFrame:
         """获取上海证券交易所数据"""
@@ -80,7 +538,7 @@ class StockDataAPI:
         #     symbol = f"{symbol}.SH"
         
         # 获取股票历史数据
-        df = ak.stock_zh_a_hist(symbol=symbol, period=period, 
+        df = self.provider.stock_zh_a_hist(symbol=symbol, period=period, 
                                start_date=start_date, end_date=end_date, adjust=adjust)
         
         # 数据清洗和格式化
@@ -95,7 +553,7 @@ class StockDataAPI:
         #     symbol = f"{symbol}.SZ"
         
         # 获取股票历史数据
-        df = ak.stock_zh_a_hist(symbol=symbol, period=period,
+        df = self.provider.stock_zh_a_hist(symbol=symbol, period=period,
                                start_date=start_date, end_date=end_date, adjust=adjust)
         
         # 数据清洗和格式化
@@ -110,7 +568,7 @@ class StockDataAPI:
         #     symbol = f"{symbol}.SZ"
         
         # 获取股票历史数据
-        df = ak.stock_zh_a_hist(symbol=symbol, period=period,
+        df = self.provider.stock_zh_a_hist(symbol=symbol, period=period,
                                start_date=start_date, end_date=end_date, adjust=adjust)
         
         # 数据清洗和格式化
@@ -118,97 +576,90 @@ class StockDataAPI:
         return df
     
     def _get_us_data(self, symbol: str, start_date: str, end_date: str,
-                    period: str, adjust: str) -> pd.DataFrame:
-        """获取美股数据"""
+                    period: str, adjust: str) -> Optional[pd.DataFrame]:
+        """
+        获取美股数据：区间内无交易日时返回空表；所有 secid 请求都失败（异常）时返回 None，
+        调用方据此区分"没有数据"和"没取到数据"
+        """
         # 转换日期格式
         start_date_us = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:8]}"
         end_date_us = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:8]}"
 
         # 仅支持三种前缀：105. / 106. / 107.
         user_raw = (symbol or "").strip().upper()
-        base = user_raw.split('.')[-1] if '.' in user_raw else user_raw
+        # 去掉用户可能带上的 secid 前缀（如 105.AAPL），保留 BRK.B 这类代码本身的点
+        head, _, tail = user_raw.partition('.')
+        base = tail if head.isdigit() and tail else user_raw
+
+        responded = False   # 是否有任一 secid 请求正常返回（即使为空表）
+
+        def fetch(secid):
+            nonlocal responded
+            df = self.provider.stock_us_hist(symbol=secid, period=period,
+                                    start_date=start_date_us, end_date=end_date_us, adjust=adjust)
+            responded = True
+            return df
+
+        # 已确认的 secid：调用成功即返回（区间内无交易日时为空表），不再试探其他前缀
+        known = self.us_secids.resolved(base)
+        if known:
+            try:
+                df = fetch(known)
+                return self._format_dataframe(df, '美股') if df is not None else pd.DataFrame()
+            except Exception:
+                self.us_secids.forget(base)
+
         # 允许点/横杠两种写法
         forms = {base, base.replace('.', '-'), base.replace('-', '.')}
         cand_hist = []
+        hint = self.us_secids.hint(base)
+        if hint:
+            cand_hist.append(hint)
         for form in forms:
             for px in ["105", "106", "107"]:
                 cand_hist.append(f"{px}.{form}")
-        # 去重并尝试
-        tried = set()
-        for cand in cand_hist:
-            sc = cand.strip()
-            if not sc or sc in tried:
-                continue
-            tried.add(sc)
+        # 去重，保持顺序
+        cand_hist = list(dict.fromkeys(c.strip() for c in cand_hist if c.strip()))
+
+        # 先试交易所推断的 secid，失败后并发试探其余候选，取第一个成功的
+        if hint:
             try:
-                df = ak.stock_us_hist(symbol=sc, period=period,
-                                      start_date=start_date_us, end_date=end_date_us, adjust=adjust)
-                #df = ak.stock_us_daily(symbol=sc)
+                df = fetch(hint)
                 if df is not None and not df.empty:
+                    self.us_secids.remember(base, hint)
                     return self._format_dataframe(df, '美股')
             except Exception:
-                continue
+                pass
+            cand_hist.remove(hint)
+
+        executor = ThreadPoolExecutor(max_workers=len(cand_hist) or 1)
+        try:
+            futures = {executor.submit(fetch, sc): sc for sc in cand_hist}
+            for future in as_completed(futures):
+                try:
+                    df = future.result()
+                except Exception:
+                    continue
+                if df is not None and not df.empty:
+                    self.us_secids.remember(base, futures[future])
+                    return self._format_dataframe(df, '美股')
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-        # 未获取到
-        return pd.DataFrame()
+        # 未获取到：有请求正常返回说明区间内确实没有数据，否则视为获取失败
+        return pd.DataFrame() if responded else None
     
     def _get_us_data_sn(self, symbol: str, adjust: str):
         try:
-            df = ak.stock_us_daily(symbol=symbol, adjust=adjust)
+            df = self.provider.stock_us_daily(symbol=symbol, adjust=adjust)
             if df is not None and not df.empty:
                 return self._format_dataframe(df, '美股')
         except Exception as e:
             print(e)
 
     def _format_dataframe(self, df: pd.DataFrame, market: str) -> pd.DataFrame:
-        """格式化DataFrame"""
-        if df is None or df.empty:
-            return df
-        
-        print(f"原始数据列名: {df.columns.tolist()}")
-        
-        # 处理日期列 - 检查多种可能的列名
-        date_columns = ['日期', 'date', 'Date', 'datetime', '时间']
-        date_col = None
-        
-        for col in date_columns:
-            if col in df.columns:
-                date_col = col
-                break
-        
-        if date_col:
-            # 重命名为统一的'日期'列
-            if date_col != '日期':
-                df.rename(columns={date_col: '日期'}, inplace=True)
-            df['日期'] = pd.to_datetime(df['日期'])
-        else:
-            print(f"警告: 未找到日期列，可用列名: {df.columns.tolist()}")
-            # 如果没有找到日期列，尝试使用第一列作为日期
-            if len(df.columns) > 0:
-                first_col = df.columns[0]
-                df.rename(columns={first_col: '日期'}, inplace=True)
-                try:
-                    df['日期'] = pd.to_datetime(df['日期'])
-                except:
-                    print(f"无法将第一列 {first_col} 转换为日期")
-        
-        # 添加市场信息
-        df['市场'] = market
-        
-        # 确保数值列为float类型
-        numeric_columns = ['开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率',
-                          'open', 'close', 'high', 'low', 'volume', 'amount', 'pct_chg', 'change']
-        
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # 按日期排序（如果存在日期列）
-        if '日期' in df.columns:
-            df = df.sort_values('日期').reset_index(drop=True)
-        
-        print(f"格式化后数据列名: {df.columns.tolist()}")
-        return df
+        """格式化DataFrame（列类型见 frame_schema.COLUMN_SCHEMA，compact 模式由构造参数决定）"""
+        return format_ohlcv_frame(df, market, compact=self.compact)
     
     def get_market_list(self, market: str = 'sh') -> Optional[pd.DataFrame]:
         """
@@ -223,16 +674,16 @@ class StockDataAPI:
         try:
             if market == 'sh':
                 # 获取上证A股列表
-                df = ak.stock_sh_a_spot_em()
+                df = self.provider.stock_sh_a_spot_em()
             elif market == 'sz':
                 # 获取深证A股列表
-                df = ak.stock_sz_a_spot_em()
+                df = self.provider.stock_sz_a_spot_em()
             elif market == 'cyb':
                 # 获取创业板股票列表
-                df = ak.stock_cy_a_spot_em()
+                df = self.provider.stock_cy_a_spot_em()
             elif market == 'us':
                 # 获取美股列表
-                df = ak.stock_us_spot_em()
+                df = self.provider.stock_us_spot_em()
             else:
                 raise ValueError(f"不支持的市场类型: {market}")
             
@@ -241,7 +692,30 @@ class StockDataAPI:
         except Exception as e:
             print(f"获取市场列表失败: {str(e)}")
             return None
-    
+
+    def get_market_names(self, market: str = 'sh') -> Optional[pd.DataFrame]:
+        """
+        市场股票的 ['代码', '名称'] 名单（供代码/名称检索使用）
+        有本地存储时按发布日落盘，同一发布日内新会话/新进程直接读本地，不再下载全市场快照；
+        下载失败时退回旧名单，没有旧名单时返回 None
+        """
+        settled = settled_date(INDEX_PUBLISH_HOUR)
+        cached, meta = self.store.load_table('market_names', market) if self.store is not None else (None, {})
+        if cached is not None and not cached.empty and meta.get('checked_through') == settled:
+            return cached
+
+        df = self.get_market_list(market)
+        if df is None or df.empty or '代码' not in df.columns or '名称' not in df.columns:
+            return cached if cached is not None and not cached.empty else None
+        names = df[['代码', '名称']].dropna()
+        fetched = pd.DataFrame({
+            '代码': names['代码'].astype(str).str.strip().values,
+            '名称': names['名称'].astype(str).str.strip().values,
+        })
+        if self.store is not None:
+            self.store.save_table('market_names', market, fetched, {'checked_through': settled})
+        return fetched
+
     def get_realtime_data(self, symbol: str, market: str = 'sh') -> Optional[pd.DataFrame]:
         """
         获取实时股票数据
@@ -253,23 +727,33 @@ class StockDataAPI:
         Returns:
             DataFrame: 包含实时数据的DataFrame
         """
+        return self.get_realtime_data_batch([symbol], market)
+
+    def get_realtime_data_batch(self, symbols: List[str], market: str = 'sh') -> Optional[pd.DataFrame]:
+        """
+        批量获取实时股票数据，所有代码共用同一份全市场快照
+        
+        Args:
+            symbols: 股票代码列表
+            market: 市场类型 ('sh', 'sz', 'cyb', 'us')
+        
+        Returns:
+            DataFrame: 按输入顺序排列的实时数据，未找到的代码被跳过
+        """
         try:
             if market in ['sh', 'sz', 'cyb']:
                 # A股实时数据
-                if market == 'sh' and not symbol.endswith('.SH'):
-                    symbol = f"{symbol}.SH"
-                elif market in ['sz', 'cyb'] and not symbol.endswith('.SZ'):
-                    symbol = f"{symbol}.SZ"
-                
-                df = ak.stock_zh_a_spot_em()
-                df = df[df['代码'] == symbol.split('.')[0]]
-                
+                df, index = market_snapshots.get('a', self.provider.stock_zh_a_spot_em)
+                codes = [str(s).split('.')[0] for s in symbols]
             elif market == 'us':
                 # 美股实时数据
-                df = ak.stock_us_spot_em()
-                df = df[df['代码'] == symbol]
-            
-            return df
+                df, index = market_snapshots.get('us', self.provider.stock_us_spot_em)
+                codes = [str(s).strip().upper() for s in symbols]
+            else:
+                raise ValueError(f"不支持的市场类型: {market}")
+
+            positions = [index[c] for c in codes if c in index]
+            return df.iloc[positions].reset_index(drop=True)
             
         except Exception as e:
             print(f"获取实时数据失败: {str(e)}")
@@ -288,13 +772,13 @@ class StockDataAPI:
         try:
             df = None
             if market == 'sh':
-                df = ak.stock_sh_a_spot_em()
+                df = self.provider.stock_sh_a_spot_em()
             elif market == 'sz':
-                df = ak.stock_sz_a_spot_em()
+                df = self.provider.stock_sz_a_spot_em()
             elif market == 'cyb':
-                df = ak.stock_cy_a_spot_em()
+                df = self.provider.stock_cy_a_spot_em()
             elif market == 'us':
-                df = ak.stock_us_spot_em()
+                df = self.provider.stock_us_spot_em()
             else:
                 raise ValueError(f"不支持的市场类型: {market}")
             
@@ -332,10 +816,16 @@ class StockDataAPI:
         if df is None or df.empty or '收盘' not in df.columns:
             return df
         
-        df[f'EMA_{period}'] = df['收盘'].ewm(span=period, adjust=False).mean()
+        df[f'EMA_{period}'] = cached_indicator('ema', df['收盘'], span=period)
         
         return df
 
+    def _calculate_bollinger_bands(self, df: pd.DataFrame, period: int = 20, std_dev: float = 2.0) -> pd.DataFrame:
+        """
+        计算布林带，支持 '收盘'（A股/美股）和 'close'（us2）列，新增列同 calculate_bollinger_bands
+        """
+        return calculate_bollinger_bands(df, period, std_dev)
+
     def _get_time_series_intraday(self,
                                  symbol: str,
                                  interval: str = '15min',
@@ -347,17 +837,58 @@ class StockDataAPI:
             symbol: 股票代码 (e.g., 'IBM')
             interval: 时间间隔 ('1min', '5min', '15min', '30min', '60min')
             outputsize: 数据量 ('compact' for last 100 data points, 'full' for full-length)
-            api_key: Alpha Vantage API 密钥
 
         Returns:
             DataFrame: 包含日内交易数据的DataFrame
         """
-        global alpha_api
         if not alpha_api or alpha_api == 'YOUR_ALPHA_VANTAGE_API_KEY':
             print("错误: Alpha Vantage API 密钥未提供或为默认值。请设置您的API密钥。")
             return None
+        if self.store is not None:
+            return self._get_time_series_intraday_cached(symbol, interval, outputsize)
+        return self._fetch_time_series_intraday(symbol, interval, outputsize)
 
-        base_url = "https://www.alphavantage.co/query"
+    def _get_time_series_intraday_cached(self, symbol: str, interval: str,
+                                         outputsize: str) -> Optional[pd.DataFrame]:
+        """
+        按 (symbol, interval) 缓存日内K线：已有缓存时只请求 compact（最近100根），
+        与缓存合并（重叠部分以新数据为准，最后一根可能尚未走完）；
+        compact 与缓存之间有断档时才请求一次 full。
+        缓存元数据记录是否获取过完整历史，缓存只有 compact 数据时首次请求 full 会向数据源请求一次 full
+        """
+        key = f"{symbol.strip().upper()}_{interval}"
+        cached, meta = self.store.load_table('intraday', key)
+        has_full = bool(meta.get('full'))
+        if cached is not None and not cached.empty:
+            cached = cached.set_index('日期时间')
+            latest = None
+            if outputsize == 'full' and not has_full:
+                latest = self._fetch_time_series_intraday(symbol, interval, 'full')
+                has_full = latest is not None and not latest.empty
+            if latest is None or latest.empty:
+                latest = self._fetch_time_series_intraday(symbol, interval, 'compact')
+                if latest is not None and not latest.empty and latest.index[0] > cached.index[-1]:
+                    full = self._fetch_time_series_intraday(symbol, interval, 'full')
+                    if full is not None and not full.empty:
+                        latest = full
+                        has_full = True
+            if latest is None or latest.empty:
+                merged = cached
+            else:
+                merged = pd.concat([cached[cached.index < latest.index[0]], latest])
+        else:
+            merged = self._fetch_time_series_intraday(symbol, interval, outputsize)
+            if merged is None or merged.empty:
+                return merged
+            has_full = outputsize == 'full'
+        if merged is not cached or has_full != bool(meta.get('full')):
+            self.store.save_table('intraday', key, merged.reset_index(),
+                                  {'updated_at': datetime.now().isoformat(timespec='seconds'), 'full': has_full})
+        return merged.tail(100) if outputsize == 'compact' else merged
+
+    def _fetch_time_series_intraday(self, symbol: str, interval: str,
+                                    outputsize: str) -> Optional[pd.DataFrame]:
+        """直接请求 Alpha Vantage 日内数据"""
         params = {
             "function": "TIME_SERIES_INTRADAY",
             "symbol": symbol,
@@ -368,29 +899,16 @@ class StockDataAPI:
         }
 
         try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status() # 检查HTTP错误
-            data = response.json()
-
-            if "Time Series (Intraday)" not in data:
-                print(f"获取 {symbol} 的日内数据失败: {data.get('Note', '未知错误')}")
+            data = self._alpha_vantage_request(params)
+            if data is None:
                 return None
 
-            time_series = data["Time Series (Intraday)"]
-            df = pd.DataFrame.from_dict(time_series, orient='index')
-            df = df.astype(float) # 将所有数据转换为浮点数
-
-            # 格式化列名
-            df.columns = ['开盘', '最高', '最低', '收盘', '成交量']
-            df.index.name = '日期时间'
-            df.index = pd.to_datetime(df.index)
-            df = df.sort_index()
-
-            return df
+            series_key = next((k for k in data if k.startswith('Time Series')), None)
+            if series_key is None:
+                print(f"获取 {symbol} 的日内数据失败: {data.get('Note') or data.get('Error Message') or '未知错误'}")
+                return None
+            return self._intraday_frame(data[series_key])
 
-        except requests.exceptions.RequestException as e:
-            print(f"请求 Alpha Vantage API 失败: {e}")
-            return None
         except json.JSONDecodeError:
             print("解析 Alpha Vantage API 响应失败。")
             return None
@@ -398,6 +916,56 @@ class StockDataAPI:
             print(f"获取日内数据时发生未知错误: {e}")
             return None
 
+    def _alpha_vantage_request(self, params: dict, max_retries: int = 3,
+                               timeout: float = 15.0, backoff: float = 1.0) -> Optional[dict]:
+        """
+        通过共享连接池请求 Alpha Vantage：先向限流器排队领取额度，
+        网络错误、5xx 以及超额提示（Note/Information）按指数退避加随机抖动重试
+        """
+        limiter = get_rate_limiter('alphavantage')
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            retry = attempt < max_retries
+            try:
+                response = self.provider.http_get(self.alpha_vantage_url, params=params, timeout=timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.exceptions.HTTPError(f"HTTP {response.status_code}", response=response)
+                response.raise_for_status() # 检查HTTP错误
+                data = response.json()
+                message = str(data.get('Note') or data.get('Information') or '')
+                if not any(k.startswith('Time Series') for k in data) and 'minute' in message:
+                    # 超出每分钟调用频率：冷却后重试（每日额度用尽等提示直接返回）
+                    limiter.on_error()
+                    if not retry:
+                        return data
+                    continue
+                return data
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if not retry or (status is not None and status < 500 and status != 429):
+                    print(f"请求 Alpha Vantage API 失败: {e}")
+                    return None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not retry:
+                    print(f"请求 Alpha Vantage API 失败: {e}")
+                    return None
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+        return None
+
+    @staticmethod
+    def _intraday_frame(time_series: dict) -> pd.DataFrame:
+        """把 {时间: {'1. open': ..}} 直接转成列数组，再一次性构建DataFrame"""
+        stamps = list(time_series.keys())
+        bars = list(time_series.values())
+        columns = {}
+        for name, field in [('开盘', '1. open'), ('最高', '2. high'), ('最低', '3. low'),
+                            ('收盘', '4. close'), ('成交量', '5. volume')]:
+            columns[name] = np.array([bar[field] for bar in bars], dtype=np.float64)
+        index = pd.DatetimeIndex(pd.to_datetime(stamps), name='日期时间')
+        order = np.argsort(index.values, kind='stable')
+        df = pd.DataFrame({k: v[order] for k, v in columns.items()}, index=index[order])
+        return df
+
 # ===== 基金相关 =====
     def get_fund_nav(self,
                      fund_code: str,
@@ -411,48 +979,131 @@ class StockDataAPI:
         返回列通常包含：['日期', '单位净值', '累计净值', '涨跌幅']（视 indicator 而定）
         """
         try:
-            df = ak.fund_open_fund_info_em(symbol=fund_code, indicator=indicator)
-            if df is None or df.empty:
+            if self.store is not None:
+                df = self._get_fund_nav_cached(fund_code, indicator, end_date)
+            else:
+                df = self._normalize_fund_nav(self.provider.fund_open_fund_info_em(symbol=fund_code, indicator=indicator))
+            if df is None or df.empty or '日期' not in df.columns:
                 return df
-            # 统一日期列名
-            if '日期' not in df.columns:
-                for cand in ['净值日期', 'date', 'Date', '净值时间']:
-                    if cand in df.columns:
-                        df.rename(columns={cand: '日期'}, inplace=True)
-                        break
-            # 统一净值列名（尽可能保留原列，同时提供标准化列便于后续处理）
-            if '单位净值' not in df.columns and 'nav' in df.columns:
-                df.rename(columns={'nav': '单位净值'}, inplace=True)
-            if '累计净值' not in df.columns and 'acc_nav' in df.columns:
-                df.rename(columns={'acc_nav': '累计净值'}, inplace=True)
-            # 类型转换与时间筛选
-            if '日期' in df.columns:
-                df['日期'] = pd.to_datetime(df['日期'], errors='coerce')
-            for col in ['单位净值', '累计净值']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            if start_date and '日期' in df.columns:
-                df = df[df['日期'] >= pd.to_datetime(start_date)]
-            if end_date and '日期' in df.columns:
-                df = df[df['日期'] <= pd.to_datetime(end_date)]
-            if '日期' in df.columns:
-                df = df.sort_values('日期').reset_index(drop=True)
-            return df
+            return slice_dates(df, start_date, end_date)
         except Exception as e:
             print(f"获取基金净值失败: {str(e)}")
             return None
 
+    def _normalize_fund_nav(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """统一基金净值列名与类型，并按日期升序排列"""
+        if df is None or df.empty:
+            return df
+        # 统一日期列名
+        if '日期' not in df.columns:
+            for cand in ['净值日期', 'date', 'Date', '净值时间']:
+                if cand in df.columns:
+                    df.rename(columns={cand: '日期'}, inplace=True)
+                    break
+        # 统一净值列名（尽可能保留原列，同时提供标准化列便于后续处理）
+        if '单位净值' not in df.columns and 'nav' in df.columns:
+            df.rename(columns={'nav': '单位净值'}, inplace=True)
+        if '累计净值' not in df.columns and 'acc_nav' in df.columns:
+            df.rename(columns={'acc_nav': '累计净值'}, inplace=True)
+        # 类型转换
+        if '日期' in df.columns:
+            df['日期'] = pd.to_datetime(df['日期'], errors='coerce')
+        for col in ['单位净值', '累计净值']:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        if '日期' in df.columns:
+            df = df.dropna(subset=['日期']).sort_values('日期').reset_index(drop=True)
+        return df
+
+    def _get_fund_nav_cached(self, fund_code: str, indicator: str,
+                             end_date: Optional[str]) -> Optional[pd.DataFrame]:
+        """
+        按 (基金代码, 指标) 缓存净值历史。fund_open_fund_info_em 不支持日期参数，
+        因此每个发布日（晚间净值公布后）最多下载一次，并只把比本地最后日期更新的净值追加进缓存
+        """
+        key = f"{fund_code}_{indicator}"
+        cached, meta = self.store.load_table('funds', key)
+        settled = settled_date(FUND_PUBLISH_HOUR)
+        if cached is not None and not cached.empty:
+            last_date = cached['日期'].iloc[-1]
+            if meta.get('checked_through') == settled:
+                return cached
+            if end_date and pd.Timestamp(end_date) <= last_date:
+                return cached
+
+        fetched = self._normalize_fund_nav(self.provider.fund_open_fund_info_em(symbol=fund_code, indicator=indicator))
+        if fetched is None or fetched.empty or '日期' not in fetched.columns:
+            return cached if cached is not None else fetched
+        if cached is not None and not cached.empty:
+            newer = slice_dates(fetched, (last_date + timedelta(days=1)).strftime('%Y%m%d'))
+            fetched = pd.concat([cached, newer], ignore_index=True)
+        self.store.save_table('funds', key, fetched, {'checked_through': settled})
+        return fetched
+
     def get_open_fund_daily_list(self) -> Optional[pd.DataFrame]:
         """
         获取开放式基金日行情列表（快照）
         """
         try:
-            df = ak.fund_open_fund_daily_em()
+            df = self.provider.fund_open_fund_daily_em()
             return df
         except Exception as e:
             print(f"获取基金列表失败: {str(e)}")
             return None
 
+    def get_fund_name_map(self) -> Dict[str, str]:
+        """
+        获取 基金代码 -> 基金简称 映射
+        全进程共享；有本地存储时名单按发布日落盘，同一发布日内新会话/新进程都不再重新下载
+        """
+        global _fund_names
+        settled = settled_date(FUND_PUBLISH_HOUR)
+        with _fund_names_lock:
+            if _fund_names is not None and _fund_names[0] == settled:
+                return _fund_names[1]
+            names = self._load_fund_names(settled)
+            name_map = dict(zip(names['代码'], names['名称'])) if names is not None else {}
+            if name_map:
+                _fund_names = (settled, name_map)
+            return name_map
+
+    def _load_fund_names(self, settled: str) -> Optional[pd.DataFrame]:
+        """读取本发布日的本地名单，过期时重新下载；下载失败时退回旧名单"""
+        cached, meta = self.store.load_table('fund_names', 'all') if self.store is not None else (None, {})
+        if cached is not None and not cached.empty and meta.get('checked_through') == settled:
+            return cached
+
+        fetched = None
+        try:
+            fetched = self._normalize_fund_names(self.provider.fund_name_em())
+        except Exception as e:
+            print(f"获取基金名单失败: {str(e)}")
+        if fetched is None or fetched.empty:
+            try:
+                fetched = self._normalize_fund_names(self.provider.fund_open_fund_daily_em())
+            except Exception as e:
+                print(f"获取基金列表失败: {str(e)}")
+        if fetched is None or fetched.empty:
+            return cached
+        if self.store is not None:
+            self.store.save_table('fund_names', 'all', fetched, {'checked_through': settled})
+        return fetched
+
+    @staticmethod
+    def _normalize_fund_names(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """统一为 ['代码', '名称'] 两列（fund_name_em 为 基金代码/基金简称，日行情列表为 代码/名称）"""
+        if df is None or df.empty:
+            return None
+        code_col = next((c for c in ['基金代码', '代码'] if c in df.columns), None)
+        name_col = next((c for c in ['基金简称', '名称'] if c in df.columns), None)
+        if code_col is None or name_col is None:
+            return None
+        names = df[[code_col, name_col]].dropna()
+        return pd.DataFrame({
+            '代码': names[code_col].astype(str).str.strip().values,
+            '名称': names[name_col].astype(str).str.strip().values,
+        })
+
     def get_index_history(self,
                           symbol: str,
                           start_date: Optional[str] = None,
@@ -464,28 +1115,53 @@ class StockDataAPI:
         返回包含统一的 '日期'、'收盘' 列
         """
         try:
-            df = ak.stock_zh_index_daily(symbol=symbol)
+            if self.store is not None:
+                df = self._get_index_history_cached(symbol)
+            else:
+                df = self._normalize_index_history(self.provider.stock_zh_index_daily(symbol=symbol))
             if df is None or df.empty:
                 return df
-            # 统一列
-            if 'date' in df.columns:
-                df.rename(columns={'date': '日期'}, inplace=True)
-                df['日期'] = pd.to_datetime(df['日期'])
-            if 'close' in df.columns:
-                df.rename(columns={'close': '收盘'}, inplace=True)
-                df['收盘'] = pd.to_numeric(df['收盘'], errors='coerce')
-            # 时间筛选
-            if start_date:
-                df = df[df['日期'] >= pd.to_datetime(start_date)]
-            if end_date:
-                df = df[df['日期'] <= pd.to_datetime(end_date)]
-            # 排序
-            df = df.sort_values('日期').reset_index(drop=True)
-            return df[['日期', '收盘']]
+            # 时间筛选（日期已升序，二分查找）
+            return slice_dates(df, start_date, end_date)
         except Exception as e:
             print(f"获取指数行情失败: {str(e)}")
             return None
 
+    def _normalize_index_history(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """统一指数行情为按日期升序的 ['日期', '收盘'] 两列"""
+        if df is None or df.empty:
+            return df
+        # 统一列
+        if 'date' in df.columns:
+            df.rename(columns={'date': '日期'}, inplace=True)
+            df['日期'] = pd.to_datetime(df['日期'])
+        if 'close' in df.columns:
+            df.rename(columns={'close': '收盘'}, inplace=True)
+            df['收盘'] = pd.to_numeric(df['收盘'], errors='coerce')
+        # 排序
+        df = df.sort_values('日期').reset_index(drop=True)
+        return df[['日期', '收盘']]
+
+    def _get_index_history_cached(self, symbol: str) -> Optional[pd.DataFrame]:
+        """
+        本地缓存的指数全历史：每个发布日最多刷新一次
+        （本发布日已检查过，或缓存已包含最近一个已收盘工作日的数据时不再下载；
+        收盘前检查过的缓存在收盘后会再刷新一次）
+        """
+        cached, meta = self.store.load_table('indexes', symbol)
+        settled = settled_date(INDEX_PUBLISH_HOUR)
+        if cached is not None and not cached.empty:
+            settled_day = pd.Timestamp(settled)
+            latest_weekday = settled_day - timedelta(days=max(0, settled_day.weekday() - 4))
+            if meta.get('checked_through') == settled or cached['日期'].iloc[-1] >= latest_weekday:
+                return cached
+
+        fetched = self._normalize_index_history(self.provider.stock_zh_index_daily(symbol=symbol))
+        if fetched is None or fetched.empty:
+            return cached if cached is not None else fetched
+        self.store.save_table('indexes', symbol, fetched, {'checked_through': settled})
+        return fetched
+
     def get_index_history_by_name(self,
                                   name: str,
                                   start_date: Optional[str] = None,
@@ -559,6 +1235,13 @@ def get_realtime_data(symbol: str, market: str = 'sh') -> Optional[pd.DataFrame]
     api = StockDataAPI()
     return api.get_realtime_data(symbol, market)
 
+def get_realtime_data_batch(symbols: List[str], market: str = 'sh') -> Optional[pd.DataFrame]:
+    """
+    便捷函数：批量获取实时股票数据（共用一份全市场快照）
+    """
+    api = StockDataAPI()
+    return api.get_realtime_data_batch(symbols, market)
+
 def get_screener_data(market: str = 'sh') -> Optional[pd.DataFrame]:
     """
     便捷函数：获取用于股票筛选器的实时数据
@@ -580,18 +1263,18 @@ def get_time_series_intraday(symbol: str,
 def calculate_bollinger_bands(df: pd.DataFrame, period: int = 20, std_dev: float = 2.0) -> pd.DataFrame:
     """
     计算布林带 (Bollinger Bands)
-    要求DataFrame包含 '收盘' 列
+    要求DataFrame包含 'close' 或 '收盘' 列
     """
-    if df is None or df.empty or 'close' not in df.columns:
+    close_col = 'close' if df is not None and 'close' in df.columns else '收盘'
+    if df is None or df.empty or close_col not in df.columns:
         return df
 
-    # 计算SMA (Middle Band)
-    df[f'SMA_{period}'] = df['close'].rolling(window=period).mean()
-    # 计算标准差
-    df[f'STD_{period}'] = df['close'].rolling(window=period).std()
-    # 计算上轨和下轨
-    df[f'UpperBB_{period}_{std_dev}'] = df[f'SMA_{period}'] + (df[f'STD_{period}'] * std_dev)
-    df[f'LowerBB_{period}_{std_dev}'] = df[f'SMA_{period}'] - (df[f'STD_{period}'] * std_dev)
+    # 中轨为SMA，上下轨为 中轨 ± std_dev × 标准差（一次累计和求出，相同数据与参数直接取缓存）
+    bands = cached_indicator('bollinger_bands', df[close_col], period=period, std_dev=std_dev)
+    df[f'SMA_{period}'] = bands.middle
+    df[f'STD_{period}'] = bands.std
+    df[f'UpperBB_{period}_{std_dev}'] = bands.upper
+    df[f'LowerBB_{period}_{std_dev}'] = bands.lower
     
     #print("函数内新增的列：", [col for col in df.columns if col in [f'SMA_{period}', f'STD_{period}', f'UpperBB_{period}_{std_dev}', f'LowerBB_{period}_{std_dev}']])
     return df
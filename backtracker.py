@@ -1,5 +1,4 @@
 import backtrader as bt
-import talib as ta
 import numpy as np
 import pandas as pd
 
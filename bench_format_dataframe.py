@@ -0,0 +1,68 @@
+"""
+_format_dataframe 默认模式与 compact 模式的内存/耗时对比
+默认读取全美股日线文件（symbol_index.US_DAILY_CSV_PATH）；没有该文件时可用 --synthetic 生成同规模的模拟数据
+
+用法:
+    python bench_format_dataframe.py [--csv PATH] [--synthetic] [--symbols 16000] [--days 250]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from frame_schema import format_ohlcv_frame
+from symbol_index import US_DAILY_CSV_PATH
+
+
+def make_synthetic(symbols: int, days: int) -> pd.DataFrame:
+    """生成与 stock_us_daily 列结构相同的长表"""
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2023-01-02', periods=days).strftime('%Y-%m-%d')
+    n = symbols * days
+    close = rng.lognormal(3, 1, n).round(2)
+    return pd.DataFrame({
+        'date': np.tile(dates, symbols),
+        'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+        'volume': rng.integers(0, 50_000_000, n).astype('float64'),
+        '股票代码': np.repeat([f"SYM{i:05d}" for i in range(symbols)], days),
+        '股票名称': np.repeat([f"Company {i}" for i in range(symbols)], days),
+    })
+
+
+def measure(raw: pd.DataFrame, compact: bool):
+    df = raw.copy()
+    started = time.perf_counter()
+    df = format_ohlcv_frame(df, '美股', compact=compact)
+    elapsed = time.perf_counter() - started
+    return elapsed, df.memory_usage(deep=True).sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=US_DAILY_CSV_PATH)
+    parser.add_argument('--synthetic', action='store_true')
+    parser.add_argument('--symbols', type=int, default=16000)
+    parser.add_argument('--days', type=int, default=250)
+    args = parser.parse_args()
+
+    if args.synthetic or not os.path.exists(args.csv):
+        print(f"使用模拟数据: {args.symbols} 只股票 x {args.days} 天")
+        raw = make_synthetic(args.symbols, args.days)
+    else:
+        print(f"读取 {args.csv}")
+        raw = pd.read_csv(args.csv, encoding='utf-8-sig')
+    print(f"行数: {len(raw):,}，原始内存: {raw.memory_usage(deep=True).sum() / 2**20:,.1f} MiB")
+
+    default_time, default_mem = measure(raw, compact=False)
+    compact_time, compact_mem = measure(raw, compact=True)
+    print(f"{'模式':<8}{'耗时(s)':>10}{'内存(MiB)':>14}")
+    print(f"{'default':<8}{default_time:>10.3f}{default_mem / 2**20:>14,.1f}")
+    print(f"{'compact':<8}{compact_time:>10.3f}{compact_mem / 2**20:>14,.1f}")
+    print(f"内存节省: {1 - compact_mem / default_mem:.1%}")
+
+
+if __name__ == "__main__":
+    main()
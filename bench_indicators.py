@@ -0,0 +1,91 @@
+"""
+技术指标后端基准
+在不同数据规模（日期数 × 股票数）上比较 indicator_backends 中各后端（numpy / pandas / talib）的耗时，
+先检查各后端结果一致，再给出每个指标、每档规模最快的后端；--save 写出 auto 模式使用的选择表
+
+用法:
+    python bench_indicators.py [--sizes 250x1 2500x1 250x500 2500x500] [--repeat 5] [--save indicator_backends.json]
+    INDICATOR_BACKEND=auto python ...   # 之后按选择表自动选后端
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import indicator_backends
+from indicator_backends import DEFAULT_CHECK_PARAMS, INDICATORS, available_backends, check_agreement, compute
+
+DEFAULT_SIZES = ['250x1', '2500x1', '250x500', '2500x500']
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    days, symbols = text.lower().split('x')
+    return int(days), int(symbols)
+
+
+def make_prices(days: int, symbols: int) -> pd.DataFrame:
+    """生成几何随机游走价格（单只股票时返回 Series）"""
+    rng = np.random.default_rng(0)
+    log_returns = rng.normal(0.0003, 0.02, (days, symbols))
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(log_returns, axis=0)),
+                          index=pd.bdate_range('2010-01-04', periods=days))
+    return prices[0] if symbols == 1 else prices
+
+
+def measure(name: str, backend: str, prices, repeat: int) -> float:
+    """重复 repeat 次取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compute(name, prices, backend=backend, **DEFAULT_CHECK_PARAMS[name])
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='*', default=DEFAULT_SIZES, help='数据规模，格式 日期数x股票数')
+    parser.add_argument('--backends', nargs='*', default=None, help='参与比较的后端，默认全部可用后端')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最小值')
+    parser.add_argument('--save', default=None, help='把每档最快的后端写入 auto 模式的选择表')
+    args = parser.parse_args()
+
+    backends = args.backends or available_backends()
+    print(f"后端: {', '.join(backends)}")
+
+    agreement = check_agreement(make_prices(1000, 3), backends=backends)
+    print("\n一致性检查（与 numpy 比较，全部重叠区间）:")
+    print(agreement.to_string(index=False))
+    # 结果不一致的 (后端, 指标) 不参与选择（运行时 auto 也会拒绝这些组合）
+    mismatched = {(row.backend, row.indicator) for row in agreement.itertuples() if not row.ok}
+    mismatched |= {(b, name) for b in backends for name, ok in indicator_backends.agreeing_indicators(b).items()
+                   if not ok}
+
+    profile: Dict[str, List] = {name: [] for name in INDICATORS}
+    sizes = sorted((parse_size(text) for text in args.sizes), key=lambda s: s[0] * s[1])
+    for days, symbols in sizes:
+        prices = make_prices(days, symbols)
+        print(f"\n{days} 日 × {symbols} 只:")
+        print(f"  {'指标':<18}" + ''.join(f"{b:>12}" for b in backends) + f"{'最快':>10}")
+        for name in INDICATORS:
+            timings = {b: measure(name, b, prices, args.repeat) for b in backends}
+            eligible = {b: t for b, t in timings.items() if (b, name) not in mismatched}
+            fastest = min(eligible, key=eligible.get)
+            profile[name].append([days * symbols, fastest])
+            print(f"  {name:<18}" + ''.join(f"{timings[b] * 1000:>10.2f}ms" for b in backends) + f"{fastest:>10}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=2)
+        print(f"\n选择表已写入 {args.save}，设置 INDICATOR_BACKEND=auto"
+              f"（或 indicator_backends.set_backend('auto')）后生效")
+    else:
+        print(f"\n当前默认后端: {indicator_backends.get_backend()}")
+
+
+if __name__ == "__main__":
+    main()
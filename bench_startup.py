@@ -0,0 +1,86 @@
+"""
+冷启动导入耗时
+在全新的子进程中用 `python -X importtime` 导入指定模块，按顶层包汇总累计导入耗时，
+用于检查 api / 看板启动时是否加载了 akshare、plotly、yfinance 等重型依赖
+
+用法:
+    python bench_startup.py [api stock_data_dashboard ...] [--top 15] [--repeat 3]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ['api', 'symbol_search', 'market_panel']
+
+# 首屏不应加载的重型依赖
+HEAVY_MODULES = ['akshare', 'requests', 'plotly', 'yfinance', 'talib', 'backtrader']
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, float], List[str]]:
+    """
+    在子进程中导入 module
+
+    Returns:
+        (总耗时秒, {顶层包: 累计耗时秒}, 已加载的重型依赖)
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr.strip().splitlines()[-1]}")
+    per_package: Dict[str, float] = {}
+    pending: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        package = name.split('.')[0]
+        if package in HEAVY_MODULES:
+            loaded.add(package)
+        # importtime 每层缩进两个空格，子模块先于父模块输出：第 0 层为顶层导入（含 site 等解释器启动项），
+        # 第 1 层为其直接依赖（累计时间已包含子导入），只保留属于被测模块的那一组
+        level = (indent - 1) // 2
+        if level == 1:
+            pending[package] += cumulative_us / 1e6
+        elif level == 0:
+            if name == module:
+                total = cumulative_us / 1e6
+                per_package = pending
+            pending = defaultdict(float)
+    return total, dict(per_package), sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--top', type=int, default=15, help='每个模块显示耗时最多的前 N 个依赖')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最小值')
+    args = parser.parse_args()
+
+    for module in args.modules:
+        runs = []
+        for _ in range(max(1, args.repeat)):
+            try:
+                runs.append(measure_import(module))
+            except RuntimeError as e:
+                print(e)
+                break
+        if not runs:
+            continue
+        total, per_package, loaded = min(runs, key=lambda r: r[0])
+        print(f"\n{module}: {total * 1000:,.1f} ms")
+        print(f"  已加载的重型依赖: {', '.join(loaded) if loaded else '无'}")
+        for package, seconds in sorted(per_package.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"  {package:<28}{seconds * 1000:>10,.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+批量下载的断点存储
+每批数据写成一个不可变的CSV分块（按 股票代码、日期 排序），另有一个很小的 manifest.json
+记录已完成的股票及其日期覆盖范围。断点续传只需读取 manifest；
+最终合并时对各分块做流式 k 路归并，内存占用与总数据量无关
+"""
+
+import csv
+import heapq
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from local_store import read_json, write_json
+
+SYMBOL_COL = '股票代码'
+DATE_COL = '日期'
+
+
+class ChunkedCheckpoint:
+    """追加式分块断点存储"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.manifest = read_json(self.manifest_path, default=None) or {
+            'chunks': [],
+            'symbols': {},
+            'next_chunk': 0,
+        }
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def completed_symbols(self) -> Set[str]:
+        """已完成的股票代码（O(manifest)，不读取任何分块）"""
+        return set(self.manifest['symbols'].keys())
+
+    def write_chunk(self, frames: List[pd.DataFrame]) -> Optional[str]:
+        """
+        把一批股票的数据写成一个新分块，然后更新 manifest。
+        分块先写临时文件再原子替换；若在写 manifest 前中断，该分块不会被引用，下次会被覆盖
+        """
+        frames = [f for f in frames if f is not None and not f.empty]
+        if not frames:
+            return None
+        batch = pd.concat(frames, ignore_index=True)
+        batch[SYMBOL_COL] = batch[SYMBOL_COL].astype(str)
+        batch[DATE_COL] = pd.to_datetime(batch[DATE_COL]).dt.strftime('%Y-%m-%d')
+        batch = batch.drop_duplicates(subset=[SYMBOL_COL, DATE_COL], keep='last')
+        batch = batch.sort_values([SYMBOL_COL, DATE_COL]).reset_index(drop=True)
+
+        os.makedirs(self.root, exist_ok=True)
+        name = f"chunk_{self.manifest['next_chunk']:06d}.csv"
+        path = os.path.join(self.root, name)
+        batch.to_csv(f"{path}.tmp", index=False, encoding='utf-8-sig')
+        os.replace(f"{path}.tmp", path)
+
+        stats = batch.groupby(SYMBOL_COL, sort=False)[DATE_COL].agg(['min', 'max', 'size'])
+        for symbol, row in stats.iterrows():
+            entry = self.manifest['symbols'].get(str(symbol))
+            if entry is None:
+                entry = {'first': row['min'], 'last': row['max'], 'rows': 0, 'chunks': []}
+                self.manifest['symbols'][str(symbol)] = entry
+            entry['first'] = min(entry['first'], row['min'])
+            entry['last'] = max(entry['last'], row['max'])
+            entry['rows'] += int(row['size'])
+            entry['chunks'].append(name)
+        self.manifest['chunks'].append(name)
+        self.manifest['next_chunk'] += 1
+        self.manifest['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        write_json(self.manifest, self.manifest_path)
+        return name
+
+    def import_csv(self, path: str, chunksize: int = 200_000) -> int:
+        """把旧版追加式临时CSV按块导入为分块，返回导入的行数"""
+        total = 0
+        for part in pd.read_csv(path, encoding='utf-8-sig', chunksize=chunksize, dtype={SYMBOL_COL: str}):
+            self.write_chunk([part])
+            total += len(part)
+        return total
+
+    def _iter_chunk(self, seq: int, name: str, out_columns: List[str]) -> Iterator[Tuple[Tuple[str, str], int, list]]:
+        with open(os.path.join(self.root, name), 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            position = [header.index(c) if c in header else None for c in out_columns]
+            sym_idx, date_idx = header.index(SYMBOL_COL), header.index(DATE_COL)
+            for row in reader:
+                yield ((row[sym_idx], row[date_idx]), seq,
+                       [row[i] if i is not None else '' for i in position])
+
+    def _columns(self) -> List[str]:
+        columns: List[str] = []
+        for name in self.manifest['chunks']:
+            with open(os.path.join(self.root, name), 'r', encoding='utf-8-sig', newline='') as f:
+                for col in next(csv.reader(f)):
+                    if col not in columns:
+                        columns.append(col)
+        return columns
+
+    def consolidate(self, out_path: str) -> Dict[str, int]:
+        """
+        对所有分块做流式 k 路归并，按 (股票代码, 日期) 排序写出最终CSV；
+        同一 (股票代码, 日期) 出现多次时以较新的分块为准。返回股票数与行数
+        """
+        columns = self._columns()
+        streams = [self._iter_chunk(seq, name, columns) for seq, name in enumerate(self.manifest['chunks'])]
+        symbols = 0
+        rows = 0
+        with open(f"{out_path}.tmp", 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            pending = None
+            for key, _, values in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+                if pending is not None and pending[0] != key:
+                    writer.writerow(pending[1])
+                    rows += 1
+                    if pending[0][0] != key[0]:
+                        symbols += 1
+                pending = (key, values)
+            if pending is not None:
+                writer.writerow(pending[1])
+                rows += 1
+                symbols += 1
+        os.replace(f"{out_path}.tmp", out_path)
+        return {'symbols': symbols, 'rows': rows}
+
+    def clear(self) -> None:
+        """删除全部分块与 manifest"""
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        self.manifest = {'chunks': [], 'symbols': {}, 'next_chunk': 0}
@@ -5,18 +5,57 @@ import time
 import os
 import streamlit as st
 import traceback
-import random 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from rate_limiter import get_rate_limiter
+from providers import get_provider
+from chunked_checkpoint import ChunkedCheckpoint
+from symbol_index import US_DAILY_CSV_PATH
 
 
-TEMP_CSV_PATH = "us2_stock_data_temp.csv"
-# FINAL_CSV_PATH will be dynamically generated
+TEMP_CSV_PATH = "us2_stock_data_temp.csv" # 旧版追加式临时文件，仅用于迁移
+CHECKPOINT_DIR = "us2_stock_data_chunks"
 
-def fetch_and_save_us_stock_data(user_start_date: datetime, user_end_date: datetime):
+class RateLimitedProvider:
     """
-    获取所有美股股票指定日期范围内的日级数据，并保存到本地CSV文件。
-    支持断点续传。
+    在数据源调用外层接入限速器：每次真正请求数据源前取令牌；
+    只有请求抛出异常（限流、断连、HTTP 错误）时才降速冷却，空结果（退市、区间内无数据）不算失败
     """
-    api = StockDataAPI()
+
+    def __init__(self, provider, limiter):
+        self._provider = provider
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        func = getattr(self._provider, name)
+        if not callable(func):
+            return func
+
+        def call(*args, **kwargs):
+            self._limiter.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                self._limiter.on_error()
+                raise
+            self._limiter.on_success()
+            return result
+        call.__name__ = name
+        return call
+
+
+def fetch_and_save_us_stock_data(user_start_date: datetime, user_end_date: datetime,
+                                 max_workers: int = 8, batch_size: int = 50):
+    """
+    获取所有美股股票指定日期范围内的日级数据，归并后保存到 US_DAILY_CSV_PATH。
+    支持断点续传。请求由线程池并发发出，整体速率由 sina 数据源的自适应令牌桶控制。
+    每 batch_size 只股票写一个不可变分块，断点信息记录在分块目录的 manifest 中。
+
+    Args:
+        max_workers: 并发线程数上限
+        batch_size: 每个分块包含的股票数
+    """
+    limiter = get_rate_limiter('sina')
+    api = StockDataAPI(provider=RateLimitedProvider(get_provider(), limiter))
     
     st.info("正在获取美股市场列表...")
     us_market_list = pd.read_csv('ticker_list.csv') #get_market_list(market='us')
@@ -27,111 +66,83 @@ def fetch_and_save_us_stock_data(user_start_date: datetime, user_end_date: datet
 
     st.success(f"成功获取 {len(us_market_list)} 只美股。")
     
-    processed_symbols = set()
-    if os.path.exists(TEMP_CSV_PATH):
-        st.info(f"检测到临时文件 {TEMP_CSV_PATH}，尝试从中断处恢复...")
+    checkpoint = ChunkedCheckpoint(CHECKPOINT_DIR)
+    if not checkpoint.exists() and os.path.exists(TEMP_CSV_PATH):
+        st.info(f"检测到旧版临时文件 {TEMP_CSV_PATH}，正在导入为分块...")
         try:
-            temp_df = pd.read_csv(TEMP_CSV_PATH, encoding='utf-8-sig')
-            processed_symbols = set(temp_df['股票代码'].unique())
-            st.success(f"已从临时文件加载 {len(processed_symbols)} 只股票的数据。")
+            imported_rows = checkpoint.import_csv(TEMP_CSV_PATH)
+            st.success(f"已导入 {imported_rows} 条记录。")
         except Exception as e:
-            st.warning(f"加载临时文件失败: {e}。将从头开始获取数据。")
-            processed_symbols = set() # 重置已处理列表
+            st.warning(f"导入旧版临时文件失败: {e}。将从头开始获取数据。")
+            checkpoint.clear()
+
+    processed_symbols = checkpoint.completed_symbols()
+    if processed_symbols:
+        st.success(f"已从断点记录恢复 {len(processed_symbols)} 只股票的进度。")
+
+    batch_frames = [] # 当前尚未写入分块的数据，最多 batch_size 只股票
+    pending = us_market_list[~us_market_list['symbol'].isin(processed_symbols)]
+    symbols = pending['symbol'].tolist()
+    names = pending['name'].tolist()
+    start_date_str = user_start_date.strftime('%Y-%m-%d')
+    end_date_str = user_end_date.strftime('%Y-%m-%d')
+
+    def fetch_one(symbol):
+        return api.get_stock_data(
+            symbol=symbol,
+            market='us2',
+            start_date=start_date_str,
+            end_date=end_date_str,
+            period='daily',
+            adjust='' # 不复权，或者根据需求选择qfq/hfq
+        )
 
-    all_stock_data_new = [] # 用于存储本次运行新获取的数据
-    
-    for index, row in us_market_list.iterrows():
-        symbol = row['symbol']
-        stock_name = row['name']
-
-        if symbol in processed_symbols:
-            continue
-
-        st.info(f"正在获取 {stock_name} ({symbol}) 的数据...")
-        
-        start_date_str = user_start_date.strftime('%Y-%m-%d')
-        end_date_str = user_end_date.strftime('%Y-%m-%d')
-        
-        try:
-            data = get_stock_data(
-                symbol=symbol,
-                market='us2',
-                start_date=start_date_str,
-                end_date=end_date_str,
-                period='daily',
-                adjust='' # 不复权，或者根据需求选择qfq/hfq
-            )
-            # if data is not None and not data.empty:
-            #     combined_data = data.drop_duplicates(subset=['日期']).sort_values('日期').reset_index(drop=True)
-            #     combined_data['股票代码'] = symbol
-            #     combined_data['股票名称'] = stock_name
-            #     all_stock_data_new.append(combined_data)
-
-            #     first_date = combined_data['日期'].min().strftime('%Y-%m-%d')
-            #     last_date = combined_data['日期'].max().strftime('%Y-%m-%d')
-            #     st.write(f"  - 获取 {stock_name} ({symbol}) 数据成功: 日期从 {first_date} 到 {last_date}, 共 {len(combined_data)} 条数据。")
-                
-            #     # 每次成功获取一只股票的数据后，保存到临时文件
-            #     if not os.path.exists(TEMP_CSV_PATH):
-            #         combined_data.to_csv(TEMP_CSV_PATH, index=False, encoding='utf-8-sig')
-            #     else:
-            #         combined_data.to_csv(TEMP_CSV_PATH, mode='a', header=False, index=False, encoding='utf-8-sig')
-            #     st.info(f"数据已保存到临时文件: {TEMP_CSV_PATH}")
-            # else:
-            #     st.write(f"  - 获取 {stock_name} ({symbol}) 数据失败或为空。")
-            if data is not None and not data.empty:
-                #combined_data = data.drop_duplicates(subset=['date']).sort_values('date').reset_index(drop=True)
-                combined_data = data.copy()
-                combined_data.rename(columns={'date': '日期'}, inplace=True)
-                combined_data['股票代码'] = symbol
-                combined_data['股票名称'] = stock_name
-                all_stock_data_new.append(combined_data)
-
-                first_date = combined_data['日期'].min().strftime('%Y-%m-%d')
-                last_date = combined_data['日期'].max().strftime('%Y-%m-%d')
-                st.write(f"  - 获取 {stock_name} ({symbol}) 数据成功: 日期从 {first_date} 到 {last_date}, 共 {len(combined_data)} 条数据。")
-                
-                # 每次成功获取一只股票的数据后，保存到临时文件
-                if not os.path.exists(TEMP_CSV_PATH):
-                    combined_data.to_csv(TEMP_CSV_PATH, index=False, encoding='utf-8-sig')
+    status = st.empty()
+    started = time.monotonic()
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_one, symbol): (symbol, name) for symbol, name in zip(symbols, names)}
+        for future in as_completed(futures):
+            symbol, stock_name = futures[future]
+            done += 1
+            try:
+                data = future.result()
+                if data is not None and not data.empty:
+                    combined_data = data.copy()
+                    combined_data.rename(columns={'date': '日期'}, inplace=True)
+                    combined_data['股票代码'] = symbol
+                    combined_data['股票名称'] = stock_name
+                    batch_frames.append(combined_data)
+
+                    # 攒满一批后写入新分块（仅主线程写文件）
+                    if len(batch_frames) >= batch_size:
+                        checkpoint.write_chunk(batch_frames)
+                        batch_frames = []
                 else:
-                    combined_data.to_csv(TEMP_CSV_PATH, mode='a', header=False, index=False, encoding='utf-8-sig')
-                st.info(f"数据已保存到临时文件: {TEMP_CSV_PATH}")
-            else:
-                st.write(f"  - 获取 {stock_name} ({symbol}) 数据失败或为空。")
+                    st.write(f"  - 获取 {stock_name} ({symbol}) 数据失败或为空。")
+            except Exception as e:
+                st.error(f"获取 {symbol} 数据时发生错误: {type(e).__name__} - {e}\nTraceback:\n{traceback.format_exc()}")
 
-        except Exception as e:
-            st.error(f"获取 {symbol} 数据时发生错误: {type(e).__name__} - {e}\nTraceback:\n{traceback.format_exc()}")
-        
-        time.sleep(random.randint(1, 5)) # 每次请求后暂停0.5秒，以应对可能的接口限流
+            elapsed = time.monotonic() - started
+            status.info(f"进度 {done}/{len(symbols)}，速度 {done / max(elapsed, 1e-6):.2f} 只/秒，"
+                        f"当前限速 {limiter.rate:.2f} 次/秒，最近完成: {stock_name} ({symbol})")
 
-    # 合并所有数据（包括从临时文件加载的和新获取的）
-    final_df = None
-    if os.path.exists(TEMP_CSV_PATH):
+    checkpoint.write_chunk(batch_frames)
+
+    # 流式归并所有分块（包括之前运行留下的和本次新获取的）
+    if checkpoint.manifest['chunks']:
+        final_df_path = US_DAILY_CSV_PATH
         try:
-            final_df = pd.read_csv(TEMP_CSV_PATH, encoding='utf-8-sig')
-            if all_stock_data_new:
-                newly_fetched_df = pd.concat(all_stock_data_new)
-                final_df = pd.concat([final_df, newly_fetched_df]).drop_duplicates(subset=['股票代码', '日期']).sort_values(['股票代码', '日期']).reset_index(drop=True)
-            st.success(f"最终数据包含 {len(final_df['股票代码'].unique())} 只股票，共 {len(final_df)} 条记录。")
+            summary = checkpoint.consolidate(final_df_path)
         except Exception as e:
-            st.error(f"合并临时文件和新数据时发生错误: {e}")
-            if all_stock_data_new:
-                final_df = pd.concat(all_stock_data_new).drop_duplicates(subset=['股票代码', '日期']).sort_values(['股票代码', '日期']).reset_index(drop=True)
-            else:
-                final_df = None
-    elif all_stock_data_new:
-        final_df = pd.concat(all_stock_data_new).drop_duplicates(subset=['股票代码', '日期']).sort_values(['股票代码', '日期']).reset_index(drop=True)
-
-    if final_df is not None and not final_df.empty:
-        final_df_path = f"us_stock_data_{user_start_date.strftime('%Y%m%d')}_{user_end_date.strftime('%Y%m%d')}.csv"
-        final_df.to_csv(final_df_path, index=False, encoding='utf-8-sig')
-        st.success(f"所有美股数据已成功保存到最终文件: {final_df_path}")
-        st.dataframe(final_df.head())
-        # 清理临时文件
-        if os.path.exists(TEMP_CSV_PATH):
-            os.remove(TEMP_CSV_PATH)
-            st.info(f"临时文件 {TEMP_CSV_PATH} 已清理。")
+            st.error(f"合并分块数据时发生错误: {e}。分块保留在 {CHECKPOINT_DIR}，可重新运行以继续。")
+            return
+        st.success(f"最终数据包含 {summary['symbols']} 只股票，共 {summary['rows']} 条记录。")
+        st.success(f"所有美股数据（{start_date_str} 至 {end_date_str}）已成功保存到最终文件: {final_df_path}")
+        st.dataframe(pd.read_csv(final_df_path, encoding='utf-8-sig', nrows=5))
+        # 清理分块
+        checkpoint.clear()
+        st.info(f"分块目录 {CHECKPOINT_DIR} 已清理。")
     else:
         st.error("未能获取任何美股数据。")
 
@@ -155,6 +166,8 @@ if __name__ == "__main__":
             max_value=datetime.now()
         )
 
+    max_workers = st.number_input("并发线程数", min_value=1, max_value=32, value=8, step=1)
+
     if st.button("开始获取美股数据", type="primary"):
         # Convert date.date objects to datetime.datetime for consistent comparison
         start_datetime_input = datetime.combine(start_date_input, datetime.min.time())
@@ -163,4 +176,4 @@ if __name__ == "__main__":
         if start_datetime_input > end_datetime_input:
             st.error("开始日期不能晚于结束日期。")
         else:
-            fetch_and_save_us_stock_data(start_datetime_input, end_datetime_input)
+            fetch_and_save_us_stock_data(start_datetime_input, end_datetime_input, int(max_workers))
@@ -0,0 +1,102 @@
+"""
+行情DataFrame的列规范
+统一日期列、数值列类型；compact 模式下价格用 float32、成交量用整数、
+市场/代码/名称用 category，整市场长表的内存可降到原来的几分之一
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+DATE_COLUMNS = ['日期', 'date', 'Date', 'datetime', '时间']
+
+# 列名 -> 类别
+COLUMN_SCHEMA = {
+    '开盘': 'price', '收盘': 'price', '最高': 'price', '最低': 'price', '涨跌额': 'price',
+    'open': 'price', 'close': 'price', 'high': 'price', 'low': 'price', 'change': 'price',
+    '成交量': 'volume', 'volume': 'volume',
+    '成交额': 'amount', 'amount': 'amount',
+    '振幅': 'ratio', '涨跌幅': 'ratio', '换手率': 'ratio', 'pct_chg': 'ratio',
+}
+
+# 类别 -> (默认dtype, compact dtype)；None 表示只做数值转换、保留原类型（与原有输出一致），
+# 'integer' 表示在无缺失且均为整数时压缩为最小整数类型
+KIND_DTYPES = {
+    'price': ('float64', 'float32'),
+    'ratio': ('float64', 'float32'),
+    'amount': ('float64', 'float64'),   # 成交额数值大，float32 精度不够
+    'volume': (None, 'integer'),
+}
+
+CATEGORY_COLUMNS = ['市场', '股票代码', '股票名称']
+
+
+def _to_integer(values: pd.Series) -> pd.Series:
+    # 含缺失值或小数时保留 float64：float32 只有 24 位尾数，大成交量会失真
+    if values.isna().any():
+        return values.astype('float64')
+    as_int = values.astype('int64')
+    if not (as_int == values).all():
+        return values.astype('float64')
+    # 只降到 int32，避免成交量在后续求和/拼接时溢出或反复改变类型
+    if len(as_int) == 0 or (as_int.min() >= -2**31 and as_int.max() < 2**31):
+        return as_int.astype('int32')
+    return as_int
+
+
+def format_ohlcv_frame(df: pd.DataFrame, market: Optional[str] = None, compact: bool = False) -> pd.DataFrame:
+    """
+    按 COLUMN_SCHEMA 规范化行情DataFrame（原地修改并返回）
+
+    Args:
+        df: 数据源返回的原始数据
+        market: 写入 '市场' 列的值，None 表示不添加
+        compact: 是否使用紧凑类型
+    """
+    if df is None or df.empty:
+        return df
+
+    # 处理日期列 - 检查多种可能的列名
+    date_col = next((c for c in DATE_COLUMNS if c in df.columns), None)
+    if date_col is None:
+        print(f"警告: 未找到日期列，可用列名: {df.columns.tolist()}")
+        date_col = df.columns[0]
+    if date_col != '日期':
+        df.rename(columns={date_col: '日期'}, inplace=True)
+    try:
+        df['日期'] = pd.to_datetime(df['日期'])
+    except Exception:
+        print(f"无法将列 {date_col} 转换为日期")
+
+    mode = 1 if compact else 0
+    for col in df.columns.intersection(list(COLUMN_SCHEMA)):
+        target = KIND_DTYPES[COLUMN_SCHEMA[col]][mode]
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values, errors='coerce')
+        if target is None:
+            pass
+        elif target == 'integer':
+            values = _to_integer(values)
+        elif values.dtype != target:
+            values = values.astype(target)
+        df[col] = values
+
+    # 添加市场信息
+    if market is not None:
+        if compact:
+            df['市场'] = pd.Categorical.from_codes(np.zeros(len(df), dtype='int8'), categories=[market])
+        else:
+            df['市场'] = market
+    for col in df.columns.intersection(CATEGORY_COLUMNS):
+        is_category = isinstance(df[col].dtype, pd.CategoricalDtype)
+        if compact and not is_category:
+            df[col] = df[col].astype('category')
+        elif not compact and is_category:
+            df[col] = df[col].astype(object)
+
+    # 按日期排序（已有序时不复制）
+    if pd.api.types.is_datetime64_any_dtype(df['日期']) and not df['日期'].is_monotonic_increasing:
+        df = df.sort_values('日期', kind='stable').reset_index(drop=True)
+    return df
@@ -0,0 +1,366 @@
+"""
+可切换的技术指标后端
+同一套指标接口（与 indicators.py 的函数签名、返回类型一致）可由不同实现计算：
+- numpy:  indicators.py 的向量化实现（默认）
+- pandas: rolling/ewm 写法，与原有看板代码一致，作为参照实现
+- talib:  安装 TA-Lib 时可用，逐列调用 C 实现；TA-Lib 没有的指标/参数回退到 numpy
+- auto:   按 bench_indicators.py 生成的配置，按指标和数据规模选最快的后端
+
+选择方式:
+    环境变量 INDICATOR_BACKEND=numpy/pandas/talib/auto，或运行时 set_backend('pandas')
+    auto 模式读取 INDICATOR_BACKEND_PROFILE 指定的文件（默认 indicator_backends.json）
+
+用法:
+    from indicator_backends import compute, check_agreement
+    bands = compute('bollinger_bands', df['close'], period=20, std_dev=2.0)
+    print(check_agreement(df['close']))
+
+一致性：默认后端/auto 选出的后端只用于与 numpy 结果一致的指标，不一致的 (后端, 指标) 仍由 numpy 计算。
+一致性在首次使用某后端时用固定样本（约一年日线、含上市较晚的股票）按全部重叠区间检查一次，
+例如 TA-Lib 的 EMA/MACD 以前 N 个值的 SMA 作初值、RSI 从第二根K线开始计算涨跌，预热期内数值不同，会被拒绝
+"""
+
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from indicators import ArrayLike, BollingerBands, MACD, _as_2d
+
+# 各后端都提供的指标（未实现的回退到 numpy）
+INDICATORS = ('sma', 'rolling_std', 'bollinger_bands', 'ema', 'macd', 'rsi')
+DEFAULT_BACKEND = 'numpy'
+DEFAULT_PROFILE_PATH = 'indicator_backends.json'
+
+
+# ---------------------------------------------------------------- pandas
+
+def _frame(prices: ArrayLike):
+    values, wrap = _as_2d(prices)
+    return pd.DataFrame(values), lambda df: wrap(df.to_numpy())
+
+
+def _pd_sma(prices: ArrayLike, period: int) -> ArrayLike:
+    df, wrap = _frame(prices)
+    return wrap(df.rolling(period).mean())
+
+
+def _pd_rolling_std(prices: ArrayLike, period: int, ddof: int = 1) -> ArrayLike:
+    df, wrap = _frame(prices)
+    return wrap(df.rolling(period).std(ddof=ddof))
+
+
+def _pd_bollinger_bands(prices: ArrayLike, period: int = 20, std_dev: float = 2.0) -> BollingerBands:
+    df, wrap = _frame(prices)
+    middle = df.rolling(period).mean()
+    std = df.rolling(period).std()
+    return BollingerBands(wrap(middle), wrap(std), wrap(middle + std_dev * std), wrap(middle - std_dev * std))
+
+
+def _pd_ema(prices: ArrayLike, span: int = None, alpha: float = None) -> ArrayLike:
+    df, wrap = _frame(prices)
+    return wrap(df.ewm(span=span, alpha=alpha, adjust=False).mean())
+
+
+def _pd_macd(prices: ArrayLike, fast: int = 12, slow: int = 26, signal: int = 9) -> MACD:
+    df, wrap = _frame(prices)
+    line = df.ewm(span=fast, adjust=False).mean() - df.ewm(span=slow, adjust=False).mean()
+    signal_line = line.ewm(span=signal, adjust=False).mean()
+    return MACD(wrap(line), wrap(signal_line), wrap(line - signal_line))
+
+
+def _pd_wilder(x: pd.Series, period: int) -> pd.Series:
+    """首个均值取 SMA，之后按 alpha=1/period 递推"""
+    seed = x.rolling(period).mean()
+    first = seed.first_valid_index()
+    if first is None:
+        return seed
+    start = x.index.get_loc(first)
+    seeded = x.copy()
+    seeded.iloc[:start] = np.nan
+    seeded.iloc[start] = seed.iloc[start]
+    return seeded.ewm(alpha=1.0 / period, adjust=False).mean()
+
+
+def _pd_rsi(prices: ArrayLike, period: int = 14, method: str = 'sma') -> ArrayLike:
+    df, wrap = _frame(prices)
+    delta = df.diff()
+    # 每列第一个有效价格处的涨跌记为 0
+    delta = delta.where(df.notna().cumsum() != 1, 0.0).where(df.notna())
+    gain = delta.clip(lower=0.0)
+    loss = (-delta).clip(lower=0.0)
+    if method == 'sma':
+        avg_gain, avg_loss = gain.rolling(period).mean(), loss.rolling(period).mean()
+    elif method == 'wilder':
+        avg_gain = gain.apply(lambda col: _pd_wilder(col, period))
+        avg_loss = loss.apply(lambda col: _pd_wilder(col, period))
+    else:
+        raise ValueError(f"不支持的 RSI 计算方式: {method}")
+    return wrap(100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+
+
+# ---------------------------------------------------------------- TA-Lib
+
+def _talib_columns(prices: ArrayLike, func: Callable, outputs: int = 1):
+    """TA-Lib 只接受一维 float64 数组：逐列计算后拼回矩阵"""
+    values, wrap = _as_2d(prices)
+    results = [np.full(values.shape, np.nan) for _ in range(outputs)]
+    for j in range(values.shape[1]):
+        out = func(np.ascontiguousarray(values[:, j]))
+        out = out if outputs > 1 else (out,)
+        for k in range(outputs):
+            results[k][:, j] = out[k]
+    return results, wrap
+
+
+def _make_talib_backend(ta) -> Dict[str, Callable]:
+    def sma(prices: ArrayLike, period: int) -> ArrayLike:
+        (out,), wrap = _talib_columns(prices, lambda x: ta.SMA(x, timeperiod=period))
+        return wrap(out)
+
+    def rolling_std(prices: ArrayLike, period: int, ddof: int = 1) -> ArrayLike:
+        # TA-Lib 的 STDDEV 为总体标准差，换算为 ddof 对应的样本标准差
+        scale = np.sqrt(period / (period - ddof))
+        (out,), wrap = _talib_columns(prices, lambda x: ta.STDDEV(x, timeperiod=period, nbdev=1.0))
+        return wrap(out * scale)
+
+    def bollinger_bands(prices: ArrayLike, period: int = 20, std_dev: float = 2.0) -> BollingerBands:
+        scale = np.sqrt(period / (period - 1.0))
+        (middle, std), wrap = _talib_columns(
+            prices, lambda x: (ta.SMA(x, timeperiod=period), ta.STDDEV(x, timeperiod=period, nbdev=1.0)), 2)
+        std = std * scale
+        return BollingerBands(wrap(middle), wrap(std), wrap(middle + std_dev * std), wrap(middle - std_dev * std))
+
+    def ema(prices: ArrayLike, span: int = None, alpha: float = None) -> ArrayLike:
+        if span is None:
+            # TA-Lib 只接受整数周期
+            return indicators.ema(prices, span=span, alpha=alpha)
+        (out,), wrap = _talib_columns(prices, lambda x: ta.EMA(x, timeperiod=span))
+        return wrap(out)
+
+    def macd(prices: ArrayLike, fast: int = 12, slow: int = 26, signal: int = 9) -> MACD:
+        # 用 EMA 组合而不是 ta.MACD：后者对快线另有对齐方式，预热后收敛很慢
+        def columns(x):
+            line = ta.EMA(x, timeperiod=fast) - ta.EMA(x, timeperiod=slow)
+            return line, ta.EMA(line, timeperiod=signal)
+
+        (line, signal_line), wrap = _talib_columns(prices, columns, 2)
+        return MACD(wrap(line), wrap(signal_line), wrap(line - signal_line))
+
+    def rsi(prices: ArrayLike, period: int = 14, method: str = 'sma') -> ArrayLike:
+        if method != 'wilder':
+            # TA-Lib 的 RSI 只有 Wilder 平滑
+            return indicators.rsi(prices, period=period, method=method)
+        (out,), wrap = _talib_columns(prices, lambda x: ta.RSI(x, timeperiod=period))
+        return wrap(out)
+
+    return {'sma': sma, 'rolling_std': rolling_std, 'bollinger_bands': bollinger_bands,
+            'ema': ema, 'macd': macd, 'rsi': rsi}
+
+
+# ---------------------------------------------------------------- 注册表
+
+_backends: Dict[str, Dict[str, Callable]] = {
+    'numpy': {name: getattr(indicators, name) for name in INDICATORS},
+    'pandas': {'sma': _pd_sma, 'rolling_std': _pd_rolling_std, 'bollinger_bands': _pd_bollinger_bands,
+               'ema': _pd_ema, 'macd': _pd_macd, 'rsi': _pd_rsi},
+}
+_current_backend: Optional[str] = None
+_profile: Optional[Dict[str, List]] = None
+_agreement: Dict[str, Dict[str, bool]] = {}   # 后端 -> {指标名: 是否与 numpy 一致}
+_lock = threading.Lock()
+
+
+def register_backend(name: str, functions: Dict[str, Callable]) -> None:
+    """注册后端：functions 为 {指标名: 函数}，签名与 indicators.py 中同名函数一致"""
+    with _lock:
+        _backends[name] = dict(functions)
+        _agreement.pop(name, None)
+
+
+def _load_talib() -> bool:
+    if 'talib' in _backends:
+        return True
+    try:
+        import talib
+    except ImportError:
+        return False
+    register_backend('talib', _make_talib_backend(talib))
+    return True
+
+
+def available_backends() -> List[str]:
+    """当前可用的后端（talib 需要已安装 TA-Lib）"""
+    _load_talib()
+    return sorted(_backends)
+
+
+def set_backend(name: str) -> None:
+    """设置全进程默认后端：numpy / pandas / talib / auto"""
+    global _current_backend, _profile
+    if name != 'auto' and name not in available_backends():
+        raise ValueError(f"不可用的指标后端: {name}（可用: {', '.join(available_backends())}）")
+    with _lock:
+        _current_backend = name
+        _profile = None
+    _report_refused(name)
+
+
+def get_backend() -> str:
+    """当前默认后端名，未设置时读取环境变量 INDICATOR_BACKEND"""
+    global _current_backend
+    if _current_backend is None:
+        name = os.environ.get('INDICATOR_BACKEND', DEFAULT_BACKEND)
+        if name != 'auto' and name not in available_backends():
+            print(f"指标后端 {name} 不可用，改用 {DEFAULT_BACKEND}")
+            name = DEFAULT_BACKEND
+        _current_backend = name
+        _report_refused(name)
+    return _current_backend
+
+
+def _agreement_sample() -> np.ndarray:
+    """运行时一致性检查用的固定样本：长度不同的 4 只股票右对齐（看板常见的一年左右日线）"""
+    rng = np.random.default_rng(0)
+    return indicators.stack_right_aligned(
+        [100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n))) for n in (300, 250, 120, 40)])
+
+
+def agreeing_indicators(backend: str) -> Dict[str, bool]:
+    """{指标名: 该后端是否与 numpy 一致}，每个后端只检查一次"""
+    if backend == DEFAULT_BACKEND:
+        return {name: True for name in INDICATORS}
+    if backend not in _agreement:
+        result = check_agreement(_agreement_sample(), backends=[backend])
+        _agreement[backend] = dict(zip(result['indicator'], result['ok']))
+    return _agreement[backend]
+
+
+def _report_refused(backend: str) -> None:
+    if backend in ('auto', DEFAULT_BACKEND) or backend not in _backends:
+        return
+    refused = [name for name, ok in agreeing_indicators(backend).items() if not ok]
+    if refused:
+        print(f"指标后端 {backend} 的 {', '.join(refused)} 与 {DEFAULT_BACKEND} 结果不一致，这些指标仍使用 {DEFAULT_BACKEND}")
+
+
+def _load_profile() -> Dict[str, List]:
+    """auto 模式的选择表：{指标名: [[数据点数上限, 后端名], ...]}（按上限升序），由 bench_indicators.py --save 生成"""
+    global _profile
+    if _profile is None:
+        path = os.environ.get('INDICATOR_BACKEND_PROFILE', DEFAULT_PROFILE_PATH)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                _profile = json.load(f)
+        except (OSError, ValueError):
+            _profile = {}
+    return _profile
+
+
+def resolve(name: str, prices: ArrayLike, backend: Optional[str] = None) -> str:
+    """
+    确定 name 这次实际使用的后端。
+    未显式指定 backend 时（默认后端或 auto），与 numpy 结果不一致的 (后端, 指标) 改用 numpy
+    """
+    explicit = backend is not None
+    backend = backend or get_backend()
+    if backend == 'auto':
+        entries = _load_profile().get(name, [])
+        cells = int(np.prod(np.shape(prices)))
+        # 超过测试过的最大规模时沿用最后一档
+        backend = entries[-1][1] if entries else DEFAULT_BACKEND
+        for limit, choice in entries:
+            if cells <= limit:
+                backend = choice
+                break
+        if backend not in available_backends():
+            # 配置文件来自装有 TA-Lib 的机器时，本机没有则回退
+            backend = DEFAULT_BACKEND
+    if backend not in _backends and not (backend == 'talib' and _load_talib()):
+        raise ValueError(f"不可用的指标后端: {backend}")
+    if name not in _backends[backend]:
+        return DEFAULT_BACKEND
+    if not explicit and not agreeing_indicators(backend).get(name, False):
+        return DEFAULT_BACKEND
+    return backend
+
+
+def compute(name: str, prices: ArrayLike, backend: Optional[str] = None, **params):
+    """
+    用指定（或默认）后端计算指标 name，返回值与 indicators.<name> 相同类型。
+    后端没有实现的指标（如 bollinger_sweep）直接使用 indicators.py；
+    显式指定 backend 时不做一致性拦截（check_agreement 与基准脚本用）
+    """
+    if name not in INDICATORS:
+        return getattr(indicators, name)(prices, **params)
+    return _backends[resolve(name, prices, backend)][name](prices, **params)
+
+
+# ---------------------------------------------------------------- 一致性检查
+
+DEFAULT_CHECK_PARAMS = {
+    'sma': {'period': 20},
+    'rolling_std': {'period': 20},
+    'bollinger_bands': {'period': 20, 'std_dev': 2.0},
+    'ema': {'span': 12},
+    'macd': {'fast': 12, 'slow': 26, 'signal': 9},
+    'rsi': {'period': 14, 'method': 'wilder'},
+}
+
+
+def _outputs(result) -> List[np.ndarray]:
+    parts = result if isinstance(result, tuple) else (result,)
+    return [np.asarray(part, dtype=np.float64) for part in parts]
+
+
+def check_agreement(prices: ArrayLike, backends: Optional[Sequence[str]] = None,
+                    reference: str = DEFAULT_BACKEND, params: Optional[Dict[str, dict]] = None,
+                    warmup: int = 0, rtol: float = 1e-6, atol: float = 1e-8) -> pd.DataFrame:
+    """
+    比较各后端与参照后端的结果
+
+    Args:
+        prices: 测试用价格序列或矩阵
+        warmup: 每列跳过前多少个有效值，默认 0 即比较全部重叠区间（含 NaN 预热位置），
+            只在单独评估收敛后的数值时才设置
+        rtol/atol: 判定一致的误差，|差值| <= atol + rtol × |参照值|
+
+    Returns:
+        每个 (后端, 指标) 一行：最大绝对误差、最大相对误差、NaN 位置不同的个数、是否一致
+    """
+    params = {**DEFAULT_CHECK_PARAMS, **(params or {})}
+    backends = [b for b in (backends or available_backends()) if b != reference]
+    values, _ = _as_2d(prices)
+    # 每列从第一个有效价格起算（右对齐矩阵中上市较晚的股票同样如此）
+    settled = (np.cumsum(~np.isnan(values), axis=0) > warmup).reshape(np.shape(prices))
+    rows = []
+    for name in INDICATORS:
+        expected = _outputs(compute(name, prices, backend=reference, **params[name]))
+        for backend in backends:
+            actual = _outputs(compute(name, prices, backend=backend, **params[name]))
+            max_abs = max_rel = 0.0
+            nan_mismatch = 0
+            ok = True
+            for e, a in zip(expected, actual):
+                e, a = e[settled], a[settled]
+                nan_mismatch += int((np.isnan(e) != np.isnan(a)).sum())
+                both = ~np.isnan(e) & ~np.isnan(a)
+                if both.any():
+                    diff = np.abs(e[both] - a[both])
+                    scale = np.abs(e[both])
+                    max_abs = max(max_abs, float(diff.max()))
+                    max_rel = max(max_rel, float((diff / np.maximum(scale, atol)).max()))
+                    ok = ok and bool((diff <= atol + rtol * scale).all())
+            rows.append({
+                'backend': backend,
+                'indicator': name,
+                'max_abs_diff': max_abs,
+                'max_rel_diff': max_rel,
+                'nan_mismatch': nan_mismatch,
+                'ok': ok and nan_mismatch == 0,
+            })
+    return pd.DataFrame(rows, columns=['backend', 'indicator', 'max_abs_diff', 'max_rel_diff', 'nan_mismatch', 'ok'])
@@ -0,0 +1,159 @@
+"""
+指标结果缓存
+按 (股票代码, 指标名, 参数, 输入数据版本) 缓存技术指标的计算结果（经 indicator_backends 按当前后端计算），数据版本取输入序列（含日期索引）的内容哈希，
+因此前复权数据整体平移、追加新K线时都会自动失效。按 LRU 淘汰，总占用不超过内存预算，并统计命中率。
+
+用法:
+    from indicator_cache import cached_indicator, indicator_cache
+    bands = cached_indicator('bollinger_bands', df['close'], symbol='AAPL', period=20, std_dev=2.0)
+    print(indicator_cache.stats())
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import indicator_backends
+
+DEFAULT_BUDGET_MB = float(os.environ.get('INDICATOR_CACHE_MB', 256))
+
+
+def data_version(data: Any) -> str:
+    """输入数据的内容哈希（数值 + 索引 + 形状）"""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(data, (pd.Series, pd.DataFrame)):
+        h.update(np.ascontiguousarray(data.to_numpy(dtype=np.float64)).tobytes())
+        index = data.index
+        if isinstance(index, pd.DatetimeIndex) or pd.api.types.is_numeric_dtype(index):
+            h.update(np.ascontiguousarray(index.to_numpy()).tobytes())
+        else:
+            h.update(pd.util.hash_pandas_object(index, index=False).to_numpy().tobytes())
+        if isinstance(data, pd.DataFrame):
+            h.update(repr(list(data.columns)).encode('utf-8'))
+    else:
+        values = np.ascontiguousarray(np.asarray(data, dtype=np.float64))
+        h.update(values.tobytes())
+    h.update(repr(np.shape(data)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _hashable(value: Any) -> Any:
+    """列表/区间等参数（如 bollinger_sweep 的 periods）转为可作缓存键的元组"""
+    if isinstance(value, (list, tuple, range, np.ndarray)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _sizeof(obj: Any) -> int:
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(obj, tuple):
+        return sum(_sizeof(item) for item in obj)
+    return sys.getsizeof(obj)
+
+
+def _freeze(obj: Any) -> Any:
+    """缓存中的数组设为只读，防止调用方原地修改污染缓存"""
+    if isinstance(obj, np.ndarray):
+        obj.setflags(write=False)
+    elif isinstance(obj, tuple):
+        for item in obj:
+            _freeze(item)
+    return obj
+
+
+def _thaw(obj: Any) -> Any:
+    """返回给调用方：pandas 对象返回副本，ndarray 保持只读共享"""
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        return obj.copy()
+    if isinstance(obj, tuple):
+        items = [_thaw(item) for item in obj]
+        return type(obj)(*items) if hasattr(obj, '_fields') else tuple(items)
+    return obj
+
+
+class IndicatorCache:
+    """线程安全的 LRU 指标缓存"""
+
+    def __init__(self, max_bytes: int = int(DEFAULT_BUDGET_MB * 2**20)):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[tuple, tuple]' = OrderedDict()   # key -> (结果, 字节数)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, symbol: Optional[str], name: str, params: Dict[str, Any],
+                       data: Any, compute: Callable[[], Any]) -> Any:
+        """命中时直接返回缓存结果，否则调用 compute() 计算并缓存"""
+        key = (symbol, name, tuple(sorted((k, _hashable(v)) for k, v in params.items())), data_version(data))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _thaw(entry[0])
+            self.misses += 1
+
+        # 计算放在锁外，避免慢计算阻塞其他线程的命中
+        result = _freeze(compute())
+        size = _sizeof(result)
+        with self._lock:
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (result, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._bytes -= evicted_size
+                    self.evictions += 1
+        return _thaw(result)
+
+    def stats(self) -> Dict[str, float]:
+        """命中/未命中次数、命中率、淘汰次数、条目数与占用字节数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+
+# 全进程共享（Streamlit 各次重跑、各会话共用），预算可用环境变量 INDICATOR_CACHE_MB 调整
+indicator_cache = IndicatorCache()
+
+
+def cached_indicator(name: str, data: Any, symbol: Optional[str] = None,
+                     cache: Optional[IndicatorCache] = None, **params) -> Any:
+    """
+    带缓存地调用 indicators.<name>(data, **params)
+
+    Args:
+        name: 指标名（indicators 模块中的函数名），如 'bollinger_bands'、'bollinger_sweep'、'ema'、'macd'、'rsi'
+        data: 价格序列或 (日期, 股票) 矩阵
+        symbol: 股票代码（或批量计算时的分组名），仅用于区分缓存条目
+    """
+    cache = cache if cache is not None else indicator_cache
+    backend = indicator_backends.resolve(name, data) if name in indicator_backends.INDICATORS else 'numpy'
+    return cache.get_or_compute(symbol, f"{backend}:{name}", params, data,
+                                lambda: indicator_backends.compute(name, data, backend=backend, **params))
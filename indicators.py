@@ -0,0 +1,255 @@
+"""
+批量技术指标
+所有函数接受一维序列或二维价格矩阵（行为日期、列为股票），一次向量化计算全部列：
+- SMA/布林带用累计和求滑动窗口，窗口内有缺失值时结果为 NaN；bollinger_sweep 共用一份前缀和计算多组参数
+- EMA/MACD/Wilder 平滑的递推由 pandas ewm（编译实现）完成，从每列第一个有效值开始（上市较晚的股票自然预热）
+- RSI 支持与原有代码一致的简单均值（sma）和 Wilder 平滑
+输入为 Series/DataFrame 时返回同样索引的 Series/DataFrame，否则返回 ndarray
+"""
+
+from typing import List, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+ArrayLike = Union[np.ndarray, pd.Series, pd.DataFrame]
+
+
+class BollingerBands(NamedTuple):
+    middle: ArrayLike
+    std: ArrayLike
+    upper: ArrayLike
+    lower: ArrayLike
+
+
+class MACD(NamedTuple):
+    macd: ArrayLike
+    signal: ArrayLike
+    histogram: ArrayLike
+
+
+def _as_2d(prices: ArrayLike) -> Tuple[np.ndarray, callable]:
+    """转为 float64 二维数组，并返回把结果还原为输入类型的函数"""
+    if isinstance(prices, pd.DataFrame):
+        values = prices.to_numpy(dtype=np.float64)
+        return values, lambda out: pd.DataFrame(out, index=prices.index, columns=prices.columns)
+    if isinstance(prices, pd.Series):
+        values = prices.to_numpy(dtype=np.float64).reshape(-1, 1)
+        return values, lambda out: pd.Series(out[:, 0], index=prices.index, name=prices.name)
+    values = np.asarray(prices, dtype=np.float64)
+    if values.ndim == 1:
+        return values.reshape(-1, 1), lambda out: out[:, 0]
+    return values, lambda out: out
+
+
+def _prefix_sums(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    有效值个数、和、平方和的前缀和（首行补 0），以及各列的中心值。
+    按列减去均值后再累加，减小大数相减的精度损失；任意窗口的和都可由两个前缀和相减得到
+    """
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    n = valid.sum(axis=0)
+    center = filled.sum(axis=0) / np.maximum(n, 1)
+    shifted = np.where(valid, filled - center, 0.0)
+
+    def prefix(x: np.ndarray) -> np.ndarray:
+        out = np.zeros((len(x) + 1,) + x.shape[1:])
+        np.cumsum(x, axis=0, out=out[1:])
+        return out
+
+    return prefix(valid.astype(np.float64)), prefix(shifted), prefix(shifted * shifted), center
+
+
+def _window_from_prefix(prefix: np.ndarray, period: int) -> np.ndarray:
+    """由前缀和求长度为 period 的窗口和，前 period-1 行窗口不完整，记为 0"""
+    out = np.zeros((len(prefix) - 1,) + prefix.shape[1:])
+    if len(prefix) > period:
+        out[period - 1:] = prefix[period:] - prefix[:-period]
+    return out
+
+
+def _window_sums(values: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """每个窗口的 有效值个数、和、平方和，以及各列的中心值"""
+    count, total, total_sq, center = _prefix_sums(values)
+    return (_window_from_prefix(count, period), _window_from_prefix(total, period),
+            _window_from_prefix(total_sq, period), center)
+
+
+def sma(prices: ArrayLike, period: int) -> ArrayLike:
+    """简单移动平均（窗口内需 period 个有效值，等价于 rolling(period).mean()）"""
+    values, wrap = _as_2d(prices)
+    count, total, _, center = _window_sums(values, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = np.where(count == period, total / period + center, np.nan)
+    return wrap(out)
+
+
+def rolling_std(prices: ArrayLike, period: int, ddof: int = 1) -> ArrayLike:
+    """滑动标准差（默认样本标准差，等价于 rolling(period).std()）"""
+    values, wrap = _as_2d(prices)
+    count, total, total_sq, _ = _window_sums(values, period)
+    return wrap(_std_from_sums(count, total, total_sq, period, ddof))
+
+
+def _std_from_sums(count, total, total_sq, period: int, ddof: int) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (total_sq - total * total / period) / (period - ddof)
+    var = np.maximum(var, 0.0)
+    return np.where(count == period, np.sqrt(var), np.nan)
+
+
+def bollinger_bands(prices: ArrayLike, period: int = 20, std_dev: float = 2.0) -> BollingerBands:
+    """布林带：中轨为 SMA，上下轨为 中轨 ± std_dev × 样本标准差"""
+    values, wrap = _as_2d(prices)
+    count, total, total_sq, center = _window_sums(values, period)
+    with np.errstate(invalid='ignore'):
+        middle = np.where(count == period, total / period + center, np.nan)
+    std = _std_from_sums(count, total, total_sq, period, 1)
+    return BollingerBands(wrap(middle), wrap(std), wrap(middle + std_dev * std), wrap(middle - std_dev * std))
+
+
+class BollingerSweep(NamedTuple):
+    """
+    多组参数的布林带：middle/std 形状为 (周期数, 日期数)；
+    upper/lower 按需展开为 (周期数, 标准差倍数个数, 日期数)
+    """
+    periods: np.ndarray
+    std_devs: np.ndarray
+    middle: np.ndarray
+    std: np.ndarray
+
+    @property
+    def upper(self) -> np.ndarray:
+        return self.middle[:, None, :] + self.std_devs[None, :, None] * self.std[:, None, :]
+
+    @property
+    def lower(self) -> np.ndarray:
+        return self.middle[:, None, :] - self.std_devs[None, :, None] * self.std[:, None, :]
+
+    def band(self, period: int, std_dev: float) -> BollingerBands:
+        """取出某一组 (周期, 倍数) 的布林带"""
+        i = int(np.nonzero(self.periods == period)[0][0])
+        j = int(np.nonzero(np.isclose(self.std_devs, std_dev))[0][0])
+        width = self.std_devs[j] * self.std[i]
+        return BollingerBands(self.middle[i], self.std[i], self.middle[i] + width, self.middle[i] - width)
+
+
+def bollinger_sweep(close: ArrayLike, periods: Sequence[int], std_devs: Sequence[float],
+                    dtype=np.float64) -> BollingerSweep:
+    """
+    一次计算多组 周期 × 标准差倍数 的布林带（参数调优用）。
+    累计和与平方和只算一遍，每个周期只做一次前缀和相减；标准差倍数只影响上下轨，不重复计算。
+    不修改输入
+
+    Args:
+        close: 一维收盘价序列
+        periods: 周期列表，如 range(10, 61, 5)
+        std_devs: 标准差倍数列表，如 [1.5, 2.0, 2.5]
+        dtype: 结果数组类型，float32 可再减半内存
+    """
+    values, _ = _as_2d(close)
+    if values.shape[1] != 1:
+        raise ValueError("bollinger_sweep 只接受一维收盘价序列")
+    periods = np.asarray(list(periods), dtype=np.int64)
+    std_devs = np.asarray(list(std_devs), dtype=np.float64)
+    count, total, total_sq, center = (a[..., 0] if a.ndim > 1 else a[0] for a in _prefix_sums(values))
+
+    middle = np.full((len(periods), len(values)), np.nan, dtype=dtype)
+    std = np.full((len(periods), len(values)), np.nan, dtype=dtype)
+    for i, period in enumerate(periods):
+        n = _window_from_prefix(count, period)
+        s1 = _window_from_prefix(total, period)
+        s2 = _window_from_prefix(total_sq, period)
+        full = n == period
+        middle[i, full] = s1[full] / period + center
+        var = (s2[full] - s1[full] * s1[full] / period) / (period - 1)
+        std[i, full] = np.sqrt(np.maximum(var, 0.0))
+    return BollingerSweep(periods, std_devs.astype(dtype), middle, std)
+
+
+def ema(prices: ArrayLike, span: int = None, alpha: float = None) -> ArrayLike:
+    """
+    指数移动平均，即 ewm(span=span, adjust=False).mean()：
+    首个有效值作为初值；缺失值处沿用上一个值，之后按间隔的衰减重新加权。
+    递推交给 pandas 的编译实现，不在 Python 中逐日循环
+    """
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    if isinstance(prices, (pd.Series, pd.DataFrame)):
+        return prices.astype(np.float64).ewm(alpha=alpha, adjust=False).mean()
+    values, wrap = _as_2d(prices)
+    return wrap(_ewm(values, alpha))
+
+
+def _ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    return pd.DataFrame(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def macd(prices: ArrayLike, fast: int = 12, slow: int = 26, signal: int = 9) -> MACD:
+    """MACD 线、信号线与柱状图"""
+    values, wrap = _as_2d(prices)
+    line = ema(values, span=fast) - ema(values, span=slow)
+    signal_line = ema(line, span=signal)
+    return MACD(wrap(line), wrap(signal_line), wrap(line - signal_line))
+
+
+def rsi(prices: ArrayLike, period: int = 14, method: str = 'sma') -> ArrayLike:
+    """
+    相对强弱指标
+
+    Args:
+        method: 'sma' 为涨跌幅的简单滑动平均（与原回测代码一致）；'wilder' 为 Wilder 平滑（首个均值取 SMA）
+    """
+    values, wrap = _as_2d(prices)
+    delta = np.full(values.shape, np.nan)
+    delta[1:] = values[1:] - values[:-1]
+    # 每列第一个有效价格处的涨跌记为 0（与 diff 后 where(..., 0) 的原有写法一致）
+    first = np.argmax(~np.isnan(values), axis=0)
+    has_value = ~np.isnan(values).all(axis=0)
+    cols = np.nonzero(has_value)[0]
+    delta[first[cols], cols] = 0.0
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+        loss = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+
+    if method == 'sma':
+        avg_gain, avg_loss = sma(gain, period), sma(loss, period)
+    elif method == 'wilder':
+        avg_gain, avg_loss = _wilder(gain, period), _wilder(loss, period)
+    else:
+        raise ValueError(f"不支持的 RSI 计算方式: {method}")
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return wrap(out)
+
+
+def _wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder 平滑：先取前 period 个值的 SMA，之后 avg = (avg × (period-1) + x) / period，
+    即从 SMA 初值开始的 alpha=1/period 指数平均
+    """
+    seed = sma(values, period)
+    seeded = ~np.isnan(seed)
+    first = np.argmax(seeded, axis=0)
+    cols = np.nonzero(seeded.any(axis=0))[0]
+    # 每列首个完整窗口之前置为 NaN，首个完整窗口处放入 SMA 初值，之后按原值递推
+    rows = np.arange(values.shape[0])[:, None]
+    start = np.where(seeded.any(axis=0), first, values.shape[0])
+    x = np.where(rows < start, np.nan, values)
+    x[first[cols], cols] = seed[first[cols], cols]
+    return _ewm(x, 1.0 / period)
+
+
+def stack_right_aligned(series: Sequence[ArrayLike]) -> np.ndarray:
+    """
+    把长度不同的多只股票的序列按最后一根K线右对齐，组成 (最长长度, 股票数) 矩阵，前部用 NaN 填充。
+    只关心最新值的筛选可以据此批量计算，结果与逐只计算一致（不受停牌日期不一致影响）
+    """
+    arrays: List[np.ndarray] = [np.asarray(s, dtype=np.float64).ravel() for s in series]
+    length = max((len(a) for a in arrays), default=0)
+    out = np.full((length, len(arrays)), np.nan)
+    for j, a in enumerate(arrays):
+        if len(a):
+            out[length - len(a):, j] = a
+    return out
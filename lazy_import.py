@@ -0,0 +1,47 @@
+"""
+延迟导入
+akshare、requests、plotly、yfinance 等模块导入耗时较长，用 LazyModule 包装后，
+只有第一次访问其属性时才真正导入，启动时不再为用不到的数据源付出代价
+"""
+
+import importlib
+import threading
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule:
+    """模块代理：ak = LazyModule('akshare') 之后 ak.stock_zh_a_hist(...) 在首次调用时才导入 akshare"""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        module: Optional[ModuleType] = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        """是否已经真正导入"""
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<LazyModule '{self.__dict__['_name']}' ({state})>"
@@ -0,0 +1,218 @@
+"""
+本地行情存储
+按 market/symbol/period/adjust 分区保存K线数据（Parquet，未安装 pyarrow 时退化为 pickle），
+并记录每个分区已覆盖的日期区间，供 StockDataAPI 读穿缓存使用
+"""
+
+import os
+import json
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    FRAME_EXT = '.parquet'
+except ImportError:
+    FRAME_EXT = '.pkl'
+
+DEFAULT_STORE_DIR = 'local_store'
+
+
+def read_frame(path: str) -> Optional[pd.DataFrame]:
+    """读取本地保存的DataFrame，文件不存在或损坏时返回None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        if path.endswith('.parquet'):
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"读取本地缓存失败 {path}: {e}")
+        return None
+
+
+def _temp_path(path: str) -> str:
+    """在目标文件同目录下创建唯一的临时文件（多个会话/线程同时写同一分区时互不覆盖）"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    os.close(fd)
+    return tmp_path
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def write_frame(df: pd.DataFrame, path: str) -> None:
+    """原子写入DataFrame（先写临时文件再替换），避免中断时留下半截文件"""
+    tmp_path = _temp_path(path)
+    try:
+        if path.endswith('.parquet'):
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+
+
+def read_json(path: str, default=None):
+    """读取JSON元数据，文件不存在或损坏时返回default"""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+
+def write_json(obj, path: str) -> None:
+    """原子写入JSON元数据"""
+    tmp_path = _temp_path(path)
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+
+
+def slice_dates(df: pd.DataFrame, start_date: Optional[str] = None,
+                end_date: Optional[str] = None, date_col: str = '日期') -> pd.DataFrame:
+    """
+    按日期截取已按日期升序排列的DataFrame（二分查找，不做全表布尔掩码）
+    start_date/end_date 支持 'YYYYMMDD' 或 'YYYY-MM-DD'
+    """
+    if df is None or df.empty or date_col not in df.columns:
+        return df
+    dates = df[date_col].values
+    lo = 0 if not start_date else dates.searchsorted(pd.Timestamp(start_date).to_datetime64(), side='left')
+    hi = len(df) if not end_date else dates.searchsorted(pd.Timestamp(end_date).to_datetime64(), side='right')
+    return df.iloc[lo:hi].reset_index(drop=True)
+
+
+def _shift_day(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, '%Y%m%d') + timedelta(days=days)).strftime('%Y%m%d')
+
+
+def merge_ranges(ranges: List[List[str]]) -> List[List[str]]:
+    """合并重叠或首尾相接的日期区间（'YYYYMMDD'，闭区间）"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= _shift_day(merged[-1][1], 1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def range_covered(ranges: List[List[str]], start_date: str, end_date: str) -> bool:
+    """判断 [start_date, end_date] 是否完全落在已覆盖区间内"""
+    return any(start <= start_date and end_date <= end for start, end in ranges)
+
+
+def missing_ranges(ranges: List[List[str]], start_date: str, end_date: str) -> List[List[str]]:
+    """返回 [start_date, end_date] 中尚未被覆盖的子区间（头部、中间空洞、尾部）"""
+    gaps = []
+    cursor = start_date
+    for start, end in merge_ranges(ranges):
+        if end < cursor:
+            continue
+        if start > end_date:
+            break
+        if start > cursor:
+            gaps.append([cursor, _shift_day(start, -1)])
+        cursor = max(cursor, _shift_day(end, 1))
+    if cursor <= end_date:
+        gaps.append([cursor, end_date])
+    return gaps
+
+
+def stable_end_date(end_date: str) -> str:
+    """
+    可以记为"已覆盖"的最晚日期：当天的K线在收盘前仍会变化，
+    因此只把截至昨天的数据视为稳定，当天总会在下次请求时重新获取
+    """
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+    return min(end_date, yesterday)
+
+
+def settled_date(close_hour: int, now: Optional[datetime] = None) -> str:
+    """
+    最近一个数据已发布的日期（'YYYYMMDD'）：当天 close_hour 点之后为当天，之前为前一天。
+    "每天最多刷新一次"的标记记录这个日期而不是日历日，收盘前检查过的缓存在收盘发布后仍会刷新
+    """
+    now = now or datetime.now()
+    day = now if now.hour >= close_hour else now - timedelta(days=1)
+    return day.strftime('%Y%m%d')
+
+
+class LocalBarStore:
+    """按 market/period/adjust/symbol 分区的本地K线存储"""
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        self.root = root
+
+    def _paths(self, market: str, symbol: str, period: str, adjust: str) -> Tuple[str, str]:
+        safe_symbol = symbol.strip().upper().replace('/', '_')
+        base = os.path.join(self.root, 'bars', market, period, adjust or 'none', safe_symbol)
+        return base + FRAME_EXT, base + '.json'
+
+    def load(self, market: str, symbol: str, period: str,
+             adjust: str) -> Tuple[Optional[pd.DataFrame], List[List[str]]]:
+        """读取分区数据及其已覆盖的日期区间"""
+        frame_path, meta_path = self._paths(market, symbol, period, adjust)
+        meta = read_json(meta_path, default={})
+        df = read_frame(frame_path)
+        if df is None:
+            return None, []
+        return df, meta.get('coverage', [])
+
+    def save(self, market: str, symbol: str, period: str, adjust: str,
+             df: pd.DataFrame, coverage: List[List[str]]) -> None:
+        """写入分区数据，先写数据后写元数据，中断时最多丢失覆盖记录而不会误报覆盖"""
+        frame_path, meta_path = self._paths(market, symbol, period, adjust)
+        write_frame(df, frame_path)
+        write_json({'coverage': merge_ranges(coverage),
+                    'updated_at': datetime.now().isoformat(timespec='seconds')}, meta_path)
+
+    def upsert(self, market: str, symbol: str, period: str, adjust: str,
+               cached: Optional[pd.DataFrame], new_df: pd.DataFrame,
+               coverage: List[List[str]]) -> pd.DataFrame:
+        """把新获取的数据合并进已有分区（同一日期以新数据为准）并保存，返回合并结果"""
+        if cached is not None and not cached.empty:
+            combined = pd.concat([cached, new_df], ignore_index=True)
+            combined = combined.drop_duplicates(subset=['日期'], keep='last')
+        else:
+            combined = new_df
+        combined = combined.sort_values('日期').reset_index(drop=True)
+        self.save(market, symbol, period, adjust, combined, coverage)
+        return combined
+
+    def _table_paths(self, kind: str, key: str) -> Tuple[str, str]:
+        safe_key = key.strip().replace('/', '_')
+        base = os.path.join(self.root, kind, safe_key)
+        return base + FRAME_EXT, base + '.json'
+
+    def load_table(self, kind: str, key: str) -> Tuple[Optional[pd.DataFrame], dict]:
+        """读取非K线类的本地表（基金净值、指数、日内数据等）及其元数据"""
+        frame_path, meta_path = self._table_paths(kind, key)
+        df = read_frame(frame_path)
+        if df is None:
+            return None, {}
+        return df, read_json(meta_path, default={})
+
+    def save_table(self, kind: str, key: str, df: pd.DataFrame, meta: dict) -> None:
+        frame_path, meta_path = self._table_paths(kind, key)
+        write_frame(df, frame_path)
+        write_json(meta, meta_path)
@@ -0,0 +1,145 @@
+"""
+MarketPanel：日期 × 股票 × 字段 的稠密数组
+把整个市场的日线对齐到同一日期轴上，截面指标、筛选、收益计算都可以一次向量化完成，
+不再逐只股票循环。缺失的K线为 NaN，并由 mask 标记
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from symbol_index import US_DAILY_CSV_PATH
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# 字段 -> 可能的源列名（us2 为英文列，A股/stock_us_hist 为中文列）
+FIELD_COLUMNS = {
+    'open': ['open', '开盘'],
+    'high': ['high', '最高'],
+    'low': ['low', '最低'],
+    'close': ['close', '收盘'],
+    'volume': ['volume', '成交量'],
+}
+
+
+def _resolve_columns(columns: Iterable[str]) -> Dict[str, str]:
+    columns = set(columns)
+    resolved = {}
+    for field in FIELDS:
+        source = next((c for c in FIELD_COLUMNS[field] if c in columns), None)
+        if source is not None:
+            resolved[field] = source
+    return resolved
+
+
+class MarketPanel:
+    """对齐后的全市场行情面板，values 形状为 (日期数, 股票数, 字段数)"""
+
+    def __init__(self, dates: np.ndarray, symbols: List[str], fields: List[str], values: np.ndarray):
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.values = values
+        self.date_index = {d: i for i, d in enumerate(pd.DatetimeIndex(dates))}
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.field_index = {f: i for i, f in enumerate(self.fields)}
+        # 某日某股是否有K线
+        self.mask = ~np.isnan(values[:, :, self.field_index['close']]) if 'close' in self.field_index \
+            else ~np.isnan(values).all(axis=2)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @classmethod
+    def from_long_frame(cls, df: pd.DataFrame, symbol_col: str = '股票代码', date_col: str = '日期',
+                        dtype=np.float64) -> 'MarketPanel':
+        """
+        由 (股票代码, 日期, OHLCV) 长表构建，一次散射写入，不逐只股票循环。
+        日期缺失或无法解析的行被丢弃（factorize 会把 NaT 编为 -1，散射时会覆盖最后一个日期）
+        """
+        columns = _resolve_columns(df.columns)
+        dates = pd.to_datetime(df[date_col], errors='coerce')
+        if dates.isna().any():
+            keep = dates.notna().values
+            df, dates = df[keep], dates[keep]
+        date_codes, date_uniques = pd.factorize(dates.values, sort=True)
+        symbol_codes, symbol_uniques = pd.factorize(df[symbol_col].astype(str), sort=True)
+
+        fields = list(columns)
+        values = np.full((len(date_uniques), len(symbol_uniques), len(fields)), np.nan, dtype=dtype)
+        for k, field in enumerate(fields):
+            values[date_codes, symbol_codes, k] = pd.to_numeric(df[columns[field]], errors='coerce').values
+        return cls(np.asarray(date_uniques, dtype='datetime64[ns]'), list(symbol_uniques), fields, values)
+
+    @classmethod
+    def from_us_daily_csv(cls, csv_path: str = US_DAILY_CSV_PATH, dtype=np.float64) -> 'MarketPanel':
+        """由全美股日线文件构建（只读取需要的列）"""
+        header = pd.read_csv(csv_path, encoding='utf-8-sig', nrows=0).columns
+        wanted = ['日期', '股票代码'] + list(_resolve_columns(header).values())
+        df = pd.read_csv(csv_path, encoding='utf-8-sig', usecols=wanted, dtype={'股票代码': str})
+        return cls.from_long_frame(df, dtype=dtype)
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], dtype=np.float64) -> 'MarketPanel':
+        """由 {股票代码: get_stock_data 结果} 构建，例如批量获取的A股数据"""
+        parts = []
+        for symbol, df in frames.items():
+            if df is None or df.empty or '日期' not in df.columns:
+                continue
+            part = df.copy()
+            part['股票代码'] = symbol
+            parts.append(part)
+        if not parts:
+            raise ValueError("没有可用于构建面板的数据")
+        return cls.from_long_frame(pd.concat(parts, ignore_index=True), dtype=dtype)
+
+    def field(self, name: str) -> np.ndarray:
+        """某字段的 (日期, 股票) 二维视图"""
+        return self.values[:, :, self.field_index[name]]
+
+    def to_frame(self, name: str = 'close') -> pd.DataFrame:
+        """某字段的宽表：行为日期，列为股票代码"""
+        return pd.DataFrame(self.field(name), index=pd.DatetimeIndex(self.dates, name='日期'),
+                            columns=self.symbols)
+
+    def symbol_frame(self, symbol: str) -> pd.DataFrame:
+        """单只股票的 OHLCV（去掉缺失的日期）"""
+        j = self.symbol_index[symbol]
+        df = pd.DataFrame(self.values[:, j, :], columns=self.fields)
+        df.insert(0, '日期', self.dates)
+        return df[self.mask[:, j]].reset_index(drop=True)
+
+    def slice_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> 'MarketPanel':
+        """按日期截取（二分查找），返回共享底层数组的新面板"""
+        lo = 0 if not start_date else self.dates.searchsorted(np.datetime64(pd.Timestamp(start_date)), side='left')
+        hi = len(self.dates) if not end_date else self.dates.searchsorted(np.datetime64(pd.Timestamp(end_date)), side='right')
+        return MarketPanel(self.dates[lo:hi], self.symbols, self.fields, self.values[lo:hi])
+
+    def select(self, symbols: Iterable[str]) -> 'MarketPanel':
+        """只保留指定股票（不存在的代码被忽略）"""
+        keep = [s for s in symbols if s in self.symbol_index]
+        cols = [self.symbol_index[s] for s in keep]
+        return MarketPanel(self.dates, keep, self.fields, self.values[:, cols, :])
+
+    def returns(self, name: str = 'close') -> np.ndarray:
+        """逐日简单收益率，首行及缺失处为 NaN"""
+        prices = self.field(name)
+        out = np.full(prices.shape, np.nan, dtype=prices.dtype)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[1:] = prices[1:] / prices[:-1] - 1.0
+        return out
+
+    def last_valid(self, name: str = 'close') -> np.ndarray:
+        """每只股票最后一个非缺失值（整列缺失时为 NaN）"""
+        values = self.field(name)
+        valid = ~np.isnan(values)
+        last_row = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+        out = values[last_row, np.arange(values.shape[1])]
+        out[~valid.any(axis=0)] = np.nan
+        return out
+
+    def screen(self, condition: np.ndarray) -> List[str]:
+        """condition 为长度等于股票数的布尔数组，返回满足条件的股票代码"""
+        return [s for s, keep in zip(self.symbols, condition) if keep]
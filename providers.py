@@ -0,0 +1,211 @@
+"""
+数据源访问层
+StockDataAPI 通过 provider 调用 akshare 和 HTTP 接口（Alpha Vantage），provider 有三种模式：
+- live: 直接请求数据源
+- record: 请求数据源，同时把结果（含异常）和耗时录制到磁盘
+- replay: 只从录制文件返回结果，可模拟网络延迟，便于离线、可复现地测试吞吐和缓存命中率
+
+默认模式由环境变量决定:
+    STOCK_PROVIDER_MODE      live / record / replay（默认 live）
+    STOCK_PROVIDER_DIR       录制目录（默认 recordings）
+    STOCK_PROVIDER_LATENCY   回放延迟秒数；不设置时按录制时的实际耗时回放
+    STOCK_PROVIDER_LATENCY_SCALE  按录制耗时回放时的缩放系数（默认 1.0）
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from lazy_import import LazyModule
+
+ak = LazyModule('akshare')
+requests = LazyModule('requests')
+
+PROVIDER_MODES = ('live', 'record', 'replay')
+DEFAULT_RECORDING_DIR = 'recordings'
+
+# 不参与录制键、也不写入录制文件的请求参数
+SECRET_PARAMS = {'apikey'}
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """进程内共享的 keep-alive HTTP 连接池（requests.Session）"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_session = session
+        return _http_session
+
+
+class RecordedError(Exception):
+    """回放录制时数据源抛出的异常"""
+
+
+class RecordedResponse:
+    """回放的 HTTP 响应（提供 Alpha Vantage 调用用到的 requests.Response 接口）"""
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+def _request_key(name: str, payload: dict) -> str:
+    text = json.dumps([name, payload], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class DataProvider:
+    """
+    akshare 函数与 HTTP GET 的统一入口：provider.stock_zh_a_hist(...) 与 ak.stock_zh_a_hist(...) 用法相同
+    """
+
+    def __init__(self, mode: str = 'live', root: str = DEFAULT_RECORDING_DIR,
+                 latency: Optional[float] = None, latency_scale: float = 1.0):
+        """
+        Args:
+            mode: 'live' / 'record' / 'replay'
+            root: 录制目录
+            latency: 回放时每次调用的固定延迟（秒），None 表示按录制耗时 × latency_scale
+            latency_scale: 按录制耗时回放时的缩放系数，0 表示不模拟延迟
+        """
+        if mode not in PROVIDER_MODES:
+            raise ValueError(f"不支持的数据源模式: {mode}")
+        self.mode = mode
+        self.root = root
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.stats = {'calls': 0, 'recorded': 0, 'replayed': 0, 'missing': 0}
+        self._stats_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def _count(self, field: str) -> None:
+        with self._stats_lock:
+            self.stats[field] += 1
+
+    def _path(self, kind: str, name: str, key: str) -> str:
+        return os.path.join(self.root, kind, name, f"{key}.pkl")
+
+    def _record(self, path: str, entry: dict) -> None:
+        _write_atomic(path, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+        self._count('recorded')
+
+    def _replay(self, path: str, description: str) -> dict:
+        if not os.path.exists(path):
+            self._count('missing')
+            raise RecordedError(f"没有录制的请求: {description}")
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+        delay = self.latency if self.latency is not None else entry.get('elapsed', 0.0) * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        self._count('replayed')
+        return entry
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        """调用 akshare 函数 name"""
+        self._count('calls')
+        if self.mode == 'live':
+            return getattr(ak, name)(*args, **kwargs)
+
+        path = self._path('akshare', name, _request_key(name, {'args': args, 'kwargs': kwargs}))
+        if self.mode == 'replay':
+            entry = self._replay(path, f"{name}{args} {kwargs}")
+            if 'error' in entry:
+                raise RecordedError(entry['error'])
+            return entry['result']
+
+        started = time.perf_counter()
+        try:
+            result = getattr(ak, name)(*args, **kwargs)
+        except Exception as e:
+            self._record(path, {'name': name, 'args': args, 'kwargs': kwargs,
+                                'error': f"{type(e).__name__}: {e}", 'elapsed': time.perf_counter() - started})
+            raise
+        self._record(path, {'name': name, 'args': args, 'kwargs': kwargs,
+                            'result': result, 'elapsed': time.perf_counter() - started})
+        return result
+
+    def http_get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 15.0):
+        """HTTP GET，返回 requests.Response（回放时为 RecordedResponse）"""
+        self._count('calls')
+        if self.mode == 'live':
+            return get_http_session().get(url, params=params, timeout=timeout)
+
+        public = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+        path = self._path('http', 'get', _request_key(url, public))
+        if self.mode == 'replay':
+            entry = self._replay(path, f"GET {url} {public}")
+            if 'error' in entry:
+                raise requests.exceptions.ConnectionError(entry['error'])
+            return RecordedResponse(entry['status_code'], entry['text'])
+
+        started = time.perf_counter()
+        try:
+            response = get_http_session().get(url, params=params, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            self._record(path, {'url': url, 'params': public, 'error': f"{type(e).__name__}: {e}",
+                                'elapsed': time.perf_counter() - started})
+            raise
+        self._record(path, {'url': url, 'params': public, 'status_code': response.status_code,
+                            'text': response.text, 'elapsed': time.perf_counter() - started})
+        return response
+
+
+_default_provider: Optional[DataProvider] = None
+_default_provider_lock = threading.Lock()
+
+
+def get_provider() -> DataProvider:
+    """进程内共享的默认 provider（按 STOCK_PROVIDER_* 环境变量创建）"""
+    global _default_provider
+    with _default_provider_lock:
+        if _default_provider is None:
+            latency = os.environ.get('STOCK_PROVIDER_LATENCY')
+            _default_provider = DataProvider(
+                mode=os.environ.get('STOCK_PROVIDER_MODE', 'live'),
+                root=os.environ.get('STOCK_PROVIDER_DIR', DEFAULT_RECORDING_DIR),
+                latency=float(latency) if latency else None,
+                latency_scale=float(os.environ.get('STOCK_PROVIDER_LATENCY_SCALE', 1.0)),
+            )
+        return _default_provider
+
+
+def set_provider(provider: DataProvider) -> None:
+    """替换默认 provider（之后新建的 StockDataAPI 使用它）"""
+    global _default_provider
+    with _default_provider_lock:
+        _default_provider = provider
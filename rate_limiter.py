@@ -0,0 +1,99 @@
+"""
+按数据源限流
+令牌桶控制请求速率；成功时缓慢加速（加性增），出错时减半并短暂冷却（乘性减），
+从而在不触发接口封禁的前提下逼近数据源能承受的最大吞吐
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """线程安全的自适应令牌桶"""
+
+    def __init__(self,
+                 rate: float,
+                 capacity: Optional[float] = None,
+                 min_rate: float = 0.2,
+                 max_rate: Optional[float] = None,
+                 increase_step: float = 0.05,
+                 decrease_factor: float = 0.5,
+                 cooldown: float = 5.0):
+        """
+        Args:
+            rate: 初始速率（次/秒）
+            capacity: 桶容量，即允许的瞬时突发请求数，默认等于 max(1, rate)
+            min_rate / max_rate: 自适应调整的速率上下限
+            increase_step: 每次成功后增加的速率
+            decrease_factor: 每次出错后速率乘以的系数
+            cooldown: 出错后暂停发放令牌的秒数
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate * 4
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._paused_until:
+            start = max(self._last, self._paused_until)
+            self._tokens = min(self.capacity, self._tokens + (now - start) * self.rate)
+        self._last = now
+
+    def acquire(self) -> None:
+        """阻塞直到拿到一个令牌（排队等待而不是直接失败）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self) -> None:
+        """请求成功：加性提高速率"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_error(self) -> None:
+        """请求失败（多为限流或断连）：速率减半并冷却"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0
+            self._paused_until = time.monotonic() + self.cooldown
+
+
+_AV_PER_MINUTE = float(os.environ.get('ALPHA_VANTAGE_CALLS_PER_MINUTE', 5))
+
+# 各数据源的默认限流参数（次/秒）
+PROVIDER_RATES = {
+    'sina': {'rate': 2.0, 'max_rate': 10.0},        # stock_us_daily
+    'eastmoney': {'rate': 3.0, 'max_rate': 15.0},   # stock_zh_a_hist / stock_us_hist
+    # Alpha Vantage 按每分钟额度固定速率（免费版 5 次，付费版可用环境变量调整），超额提示后冷却一分钟
+    'alphavantage': {'rate': _AV_PER_MINUTE / 60, 'capacity': _AV_PER_MINUTE, 'min_rate': _AV_PER_MINUTE / 60,
+                     'max_rate': _AV_PER_MINUTE / 60, 'decrease_factor': 1.0, 'cooldown': 60.0},
+}
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    """获取进程内共享的某数据源限流器"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = TokenBucket(**PROVIDER_RATES.get(provider, {'rate': 1.0}))
+        return _limiters[provider]
@@ -0,0 +1,85 @@
+"""
+由日线在本地合成周线/月线
+开高低收按 首/最高/最低/末 聚合，成交量、成交额、换手率求和；
+涨跌额、涨跌幅、振幅按本周期收盘与上一周期收盘重新计算。
+K线日期取该周期内最后一个交易日，与 eastmoney 周线/月线的标注方式一致
+"""
+
+import pandas as pd
+
+# 周线以周一至周日为一周（A股与美股交易日均为周一至周五，日期均为交易所当地日期）
+PERIOD_FREQ = {'weekly': 'W-SUN', 'monthly': 'M'}
+
+_FIRST = ['开盘', 'open']
+_MAX = ['最高', 'high']
+_MIN = ['最低', 'low']
+_LAST = ['收盘', 'close']
+_SUM = ['成交量', '成交额', '换手率', 'volume', 'amount']
+_DERIVED = ['涨跌额', '涨跌幅', '振幅', 'change', 'pct_chg']
+
+
+def period_start(date: str, period: str) -> str:
+    """date 所在周/月的第一天（'YYYYMMDD'）"""
+    ts = pd.Timestamp(date)
+    if period == 'weekly':
+        ts = ts - pd.Timedelta(days=ts.weekday())
+    elif period == 'monthly':
+        ts = ts.replace(day=1)
+    return ts.strftime('%Y%m%d')
+
+
+def resample_bars(daily: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    把按日期升序的日线聚合为周线或月线
+
+    Args:
+        daily: 含 '日期' 列的日线（中文列或 stock_us_daily 的英文列均可）
+        period: 'weekly' 或 'monthly'；'daily' 原样返回
+    """
+    if period == 'daily' or daily is None or daily.empty:
+        return daily
+    if period not in PERIOD_FREQ:
+        raise ValueError(f"不支持的数据周期: {period}")
+
+    close_col = next((c for c in _LAST if c in daily.columns), None)
+    high_col = next((c for c in _MAX if c in daily.columns), None)
+    low_col = next((c for c in _MIN if c in daily.columns), None)
+    change_col = '涨跌额' if '涨跌额' in daily.columns else None
+
+    agg = {'日期': 'last'}
+    for col in daily.columns:
+        if col == '日期' or col in _DERIVED:
+            continue
+        if col in _FIRST:
+            agg[col] = 'first'
+        elif col in _MAX:
+            agg[col] = 'max'
+        elif col in _MIN:
+            agg[col] = 'min'
+        elif col in _SUM:
+            agg[col] = 'sum'
+        else:
+            agg[col] = 'last'
+
+    keys = daily['日期'].dt.to_period(PERIOD_FREQ[period])
+    grouped = daily.groupby(keys.values, sort=True)
+    bars = grouped.agg(agg).reset_index(drop=True)
+
+    if close_col is not None:
+        # 上一周期收盘：优先用本周期首日的 (收盘 - 涨跌额)，对停牌/数据起点也成立
+        if change_col is not None:
+            first_rows = grouped[[close_col, change_col]].first().reset_index(drop=True)
+            prev_close = first_rows[close_col] - first_rows[change_col]
+        else:
+            prev_close = bars[close_col].shift(1)
+        for col in _DERIVED:
+            if col not in daily.columns:
+                continue
+            if col in ('涨跌额', 'change'):
+                bars[col] = bars[close_col] - prev_close
+            elif col in ('涨跌幅', 'pct_chg'):
+                bars[col] = (bars[close_col] / prev_close - 1.0) * 100.0
+            elif col == '振幅' and high_col is not None and low_col is not None:
+                bars[col] = (bars[high_col] - bars[low_col]) / prev_close * 100.0
+
+    return bars[[c for c in daily.columns if c in bars.columns]]
@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
-import requests
 import json
 from datetime import datetime, timedelta
-import yfinance as yf
 from api import get_stock_finance_data
-import plotly.express as px
-import plotly.graph_objects as go
+from lazy_import import LazyModule
+
+# 以下模块在首次使用时才导入
+yf = LazyModule('yfinance')
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
 
 # 页面配置
 st.set_page_config(
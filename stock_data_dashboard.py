@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
 from datetime import datetime, timedelta
+from lazy_import import LazyModule
 from api import StockDataAPI, get_stock_data, get_market_list, get_screener_data, calculate_bollinger_bands
+from symbol_index import US_DAILY_CSV_PATH, read_symbol_rows
+from symbol_search import build_symbol_search_index, format_match
+from indicators import stack_right_aligned
+from indicator_cache import cached_indicator, indicator_cache
+
+# plotly 只在某个标签页真正画图时才导入，首屏不为图表库付出导入时间
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
 
 
 #"""主函数"""
@@ -25,31 +33,32 @@ api = StockDataAPI()
 def get_cached_stock_data(symbol, market, start_date, end_date, period, adjust):
     return api.get_stock_data(symbol, market, start_date, end_date, period, adjust)
 
-# 基金名称映射（缓存到 session_state）
+# 基金名称映射（全进程共享并按天落盘，见 StockDataAPI.get_fund_name_map）
 def get_fund_name_map() -> dict:
-    if 'fund_name_map' in st.session_state:
-        return st.session_state['fund_name_map']
-    name_map = {}
+    return api.get_fund_name_map()
+
+# 代码/名称搜索索引（按市场构建，全进程共享，每天重建一次；美股只读本地 ticker_list.csv，
+# A股名单按天落盘（见 StockDataAPI.get_market_names），只在真正需要检索时才读取或下载）
+@st.cache_resource(ttl=86400)
+def _cached_symbol_search_index(market: str):
+    if market == 'us':
+        return build_symbol_search_index()
+    names = api.get_market_names(market)
+    if names is None or names.empty:
+        # 抛出异常而不是返回空索引：st.cache_resource 不缓存异常，下次检索时会重试
+        raise LookupError(f"{market} 股票名单不可用")
+    return build_symbol_search_index(ticker_list_path=None, market_lists={market: names})
+
+def search_symbols(query: str, market: str, limit: int = 10):
+    """按代码/名称/拼音检索，名单不可用时返回空列表"""
+    query = (query or '').strip()
+    if not query:
+        return []
     try:
-        df = ak.fund_name_em()
-        if df is not None and not df.empty:
-            code_col = '基金代码' if '基金代码' in df.columns else ('代码' if '代码' in df.columns else None)
-            name_col = '基金简称' if '基金简称' in df.columns else ('名称' if '名称' in df.columns else None)
-            if code_col and name_col:
-                for _, row in df[[code_col, name_col]].dropna().iterrows():
-                    name_map[str(row[code_col]).strip()] = str(row[name_col]).strip()
-    except Exception:
-        pass
-    if not name_map:
-        try:
-            df2 = ak.fund_open_fund_daily_em()
-            if df2 is not None and not df2.empty and {'代码','名称'}.issubset(df2.columns):
-                for _, row in df2[['代码','名称']].dropna().iterrows():
-                    name_map[str(row['代码']).strip()] = str(row['名称']).strip()
-        except Exception:
-            pass
-    st.session_state['fund_name_map'] = name_map
-    return name_map
+        return _cached_symbol_search_index(market).search(query, market=market, limit=limit)
+    except LookupError as e:
+        print(f"构建搜索索引失败: {e}")
+        return []
 
 # 侧边栏参数设置
 st.sidebar.header("参数设置")
@@ -66,11 +75,17 @@ format_func=lambda x: {
 }[x]
 )
 
-# 股票代码输入
+# 股票代码输入（可输入代码、名称或拼音，下拉框给出匹配结果）
 if market == 'us':
-    symbol = st.sidebar.text_input("股票代码", value="AAPL", help="美股代码，如：AAPL, MSFT, GOOGL")
+    symbol = st.sidebar.text_input("股票代码", value="AAPL", help="美股代码或名称，如：AAPL, MSFT, 苹果")
 else:
-    symbol = st.sidebar.text_input("股票代码", value="000001", help="A股代码，如：000001, 000002, 300001")
+    symbol = st.sidebar.text_input("股票代码", value="000001", help="A股代码或名称，如：000001, 300001, 平安银行")
+# A股完整的6位代码（包括默认值）无需检索，首屏不为此读取或下载市场名单
+is_full_a_code = market != 'us' and len(symbol.strip()) == 6 and symbol.strip().isdigit()
+symbol_matches = [] if is_full_a_code else search_symbols(symbol, market, limit=10)
+if symbol_matches and symbol_matches[0].code != symbol.strip().upper():
+    picked = st.sidebar.selectbox("匹配的股票", options=symbol_matches, format_func=format_match)
+    symbol = picked.code
 
 # 日期范围选择
 col1, col2 = st.sidebar.columns(2)
@@ -175,20 +190,18 @@ with tab2:
                 
                 # 显示列表
                 st.dataframe(market_list, use_container_width=True)
-                
-                # 搜索功能
-                st.subheader("搜索股票")
-                search_term = st.text_input("输入股票代码或名称进行搜索")
-                
-                if search_term:
-                    filtered_list = market_list[
-                        (market_list['代码'].str.contains(search_term, na=False)) |
-                        (market_list['名称'].str.contains(search_term, na=False))
-                    ]
-                    st.dataframe(filtered_list, use_container_width=True)
             else:
                 st.error("获取市场列表失败")
 
+    # 搜索功能（使用内存索引，无需先获取市场列表）
+    st.subheader("搜索股票")
+    search_term = st.text_input("输入股票代码、名称或拼音进行搜索")
+
+    if search_term:
+        matches = search_symbols(search_term, market, limit=50)
+        filtered_list = pd.DataFrame(matches, columns=['代码', '名称', '中文名称', '市场', '匹配等级'])
+        st.dataframe(filtered_list.drop(columns=['匹配等级']), use_container_width=True)
+
 with tab3:
     st.header("图表分析")
 
@@ -720,6 +733,9 @@ with tab6:
                     max_indicator_period = max(st.session_state.get('bb_period', 20), st.session_state.get('ema_period', 200))
                     lookback_days = max_indicator_period * 2 # Get twice the max period to ensure enough data
 
+                    # 先逐只获取历史数据，再把收盘价按最新K线右对齐成矩阵，一次批量计算所有股票的指标
+                    hist_closes = []
+                    hist_rows = []
                     for i, (index, row) in enumerate(filtered_data.iterrows()):
                         symbol_code = row['股票代码']
                         stock_market = screener_market # Use the selected screener market
@@ -738,72 +754,64 @@ with tab6:
                             adjust='qfq' # Use front-adjusted data
                         )
 
-                        keep_stock = True
+                        # 没有历史数据的股票直接剔除
                         if hist_data is not None and not hist_data.empty and '收盘' in hist_data.columns:
-                            current_price = row['当前价格'] # Use the current price from screener_data
-
-                            # Bollinger Bands filtering
-                            if st.session_state.get('use_bollinger'):
-                                bb_period_val = st.session_state.get('bb_period', 20)
-                                bb_std_dev_val = st.session_state.get('bb_std_dev', 2.0)
-                                bb_condition_val = st.session_state.get('bb_condition')
-
-                                hist_data_with_bb = api._calculate_bollinger_bands(hist_data.copy(), bb_period_val, bb_std_dev_val)
-                                if not hist_data_with_bb.empty and len(hist_data_with_bb) >= bb_period_val:
-                                    latest_bb = hist_data_with_bb.iloc[-1]
-                                    upper_bb = latest_bb[f'UpperBB_{bb_period_val}_{bb_std_dev_val}']
-                                    lower_bb = latest_bb[f'LowerBB_{bb_period_val}_{bb_std_dev_val}']
-                                    middle_bb = latest_bb[f'SMA_{bb_period_val}']
-
-                                    if bb_condition_val == "价格突破上轨" and not (current_price > upper_bb):
-                                        keep_stock = False
-                                    elif bb_condition_val == "价格跌破下轨" and not (current_price < lower_bb):
-                                        keep_stock = False
-                                    elif bb_condition_val == "价格在中轨上方" and not (current_price > middle_bb):
-                                        keep_stock = False
-                                    elif bb_condition_val == "价格在中轨下方" and not (current_price < middle_bb):
-                                        keep_stock = False
-                                else:
-                                    keep_stock = False # Not enough data for BB or calculation failed
-
-                            # EMA filtering (only if still kept by BB or BB not used)
-                            if keep_stock and st.session_state.get('use_ema'):
-                                ema_period_val = st.session_state.get('ema_period', 20)
-                                ema_condition_val = st.session_state.get('ema_condition')
-
-                                hist_data_with_ema = api._calculate_ema(hist_data.copy(), ema_period_val)
-                                if not hist_data_with_ema.empty and len(hist_data_with_ema) >= ema_period_val:
-                                    latest_ema = hist_data_with_ema.iloc[-1][f'EMA_{ema_period_val}']
-                                    
-                                    if ema_condition_val == "价格在EMA上方" and not (current_price > latest_ema):
-                                        keep_stock = False
-                                    elif ema_condition_val == "价格在EMA下方" and not (current_price < latest_ema):
-                                        keep_stock = False
-                                    elif ema_condition_val == "EMA向上":
-                                        # Check if EMA is increasing over a short period (e.g., last 3 days)
-                                        if len(hist_data_with_ema) < ema_period_val + 3: # Need enough data for EMA and trend
-                                            keep_stock = False
-                                        else:
-                                            ema_series = hist_data_with_ema[f'EMA_{ema_period_val}'].dropna()
-                                            if len(ema_series) < 3 or not (ema_series.iloc[-1] > ema_series.iloc[-2] > ema_series.iloc[-3]):
-                                                keep_stock = False
-                                    elif ema_condition_val == "EMA向下":
-                                        # Check if EMA is decreasing over a short period (e.g., last 3 days)
-                                        if len(hist_data_with_ema) < ema_period_val + 3: # Need enough data for EMA and trend
-                                            keep_stock = False
-                                        else:
-                                            ema_series = hist_data_with_ema[f'EMA_{ema_period_val}'].dropna()
-                                            if len(ema_series) < 3 or not (ema_series.iloc[-1] < ema_series.iloc[-2] < ema_series.iloc[-3]):
-                                                keep_stock = False
-                                else:
-                                    keep_stock = False # Not enough data for EMA or calculation failed
-                        else:
-                            keep_stock = False # No historical data for this stock
-
-                        if keep_stock:
-                            stocks_to_keep.append(row)
+                            hist_closes.append(hist_data['收盘'].to_numpy(dtype=np.float64))
+                            hist_rows.append(row)
                         
                         progress_bar.progress((i + 1) / total_stocks)
+
+                    stocks_to_keep = []
+                    if hist_rows:
+                        prices = stack_right_aligned(hist_closes)
+                        lengths = np.array([len(c) for c in hist_closes])
+                        current_price = np.array([row['当前价格'] for row in hist_rows], dtype=np.float64)
+                        keep = np.ones(len(hist_rows), dtype=bool)
+
+                        # Bollinger Bands filtering（数据不足或计算失败的股票剔除）
+                        if st.session_state.get('use_bollinger'):
+                            bb_period_val = st.session_state.get('bb_period', 20)
+                            bb_std_dev_val = st.session_state.get('bb_std_dev', 2.0)
+                            bb_condition_val = st.session_state.get('bb_condition')
+
+                            bands = cached_indicator('bollinger_bands', prices, symbol=f'screener:{screener_market}',
+                                                     period=bb_period_val, std_dev=bb_std_dev_val)
+                            upper_bb, lower_bb, middle_bb = bands.upper[-1], bands.lower[-1], bands.middle[-1]
+                            keep &= lengths >= bb_period_val
+                            if bb_condition_val == "价格突破上轨":
+                                keep &= current_price > upper_bb
+                            elif bb_condition_val == "价格跌破下轨":
+                                keep &= current_price < lower_bb
+                            elif bb_condition_val == "价格在中轨上方":
+                                keep &= current_price > middle_bb
+                            elif bb_condition_val == "价格在中轨下方":
+                                keep &= current_price < middle_bb
+
+                        # EMA filtering
+                        if st.session_state.get('use_ema'):
+                            ema_period_val = st.session_state.get('ema_period', 20)
+                            ema_condition_val = st.session_state.get('ema_condition')
+
+                            ema_values = cached_indicator('ema', prices, symbol=f'screener:{screener_market}',
+                                                          span=ema_period_val)
+                            keep &= lengths >= ema_period_val
+                            if ema_condition_val == "价格在EMA上方":
+                                keep &= current_price > ema_values[-1]
+                            elif ema_condition_val == "价格在EMA下方":
+                                keep &= current_price < ema_values[-1]
+                            elif ema_condition_val in ("EMA向上", "EMA向下"):
+                                # 检查最近3天EMA的趋势，需要足够的数据
+                                keep &= lengths >= ema_period_val + 3
+                                if len(ema_values) >= 3:
+                                    last, prev, prev2 = ema_values[-1], ema_values[-2], ema_values[-3]
+                                    if ema_condition_val == "EMA向上":
+                                        keep &= (last > prev) & (prev > prev2)
+                                    else:
+                                        keep &= (last < prev) & (prev < prev2)
+                                else:
+                                    keep[:] = False
+
+                        stocks_to_keep = [row for row, kept in zip(hist_rows, keep) if kept]
                     
                     filtered_data = pd.DataFrame(stocks_to_keep)
                     progress_bar.empty() # Clear the progress bar
@@ -888,31 +896,20 @@ with tab8:
     if st.button("运行策略回测", type="primary", key='run_strategy_backtest'):
         with st.spinner("正在获取数据并运行策略..."):
             # 1. 获取股票数据
-            # 尝试从us2_stock_data_temp.csv加载数据，如果不存在则通过API获取
-            # 注意：us2_stock_data_temp.csv是日级数据，如果需要日内数据，需要调用get_time_series_intraday
-            # 1. 获取股票数据
-            # 从us2_stock_data_temp.csv加载数据
+            # 从全美股日线文件 US_DAILY_CSV_PATH（data_retrieval.py 生成）加载数据
+            # 注意：该文件是日级数据，如果需要日内数据，需要调用get_time_series_intraday
             try:
-                all_us_stock_data = pd.read_csv('us2_stock_data_temp.csv', encoding='utf-8-sig')
-                all_us_stock_data['日期'] = pd.to_datetime(all_us_stock_data['日期'])
-
-                # 筛选指定股票代码的数据
-                stock_data = all_us_stock_data[all_us_stock_data['股票代码'] == strategy_symbol].copy()
-                
-                # 筛选日期范围
-                stock_data = stock_data[
-                    (stock_data['日期'] >= pd.to_datetime(strategy_start_date)) &
-                    (stock_data['日期'] <= pd.to_datetime(strategy_end_date))
-                ]
+                # 通过按股票的字节偏移索引只读取该股票的行（索引首次使用时建立）
+                stock_data = read_symbol_rows(strategy_symbol, strategy_start_date, strategy_end_date)
                 
                 if stock_data.empty:
-                    st.error(f"在 'us2_stock_data_temp.csv' 中未能找到 {strategy_symbol} 在指定日期范围内的历史数据。")
+                    st.error(f"在 '{US_DAILY_CSV_PATH}' 中未能找到 {strategy_symbol} 在指定日期范围内的历史数据。")
                     # No return here, let the script continue to the end of the 'with st.spinner' block
             except FileNotFoundError:
-                st.error("未找到 'us2_stock_data_temp.csv' 文件。请确保文件存在。")
+                st.error(f"未找到 '{US_DAILY_CSV_PATH}' 文件。请先用 data_retrieval.py 下载全美股日线。")
                 # No return here
             except Exception as e:
-                st.error(f"加载或处理 'us2_stock_data_temp.csv' 文件时发生错误: {e}")
+                st.error(f"加载或处理 '{US_DAILY_CSV_PATH}' 文件时发生错误: {e}")
                 # No return here
 
             # Only proceed if stock_data is valid after loading attempts
@@ -925,25 +922,24 @@ with tab8:
             # 计算布林带
             df = calculate_bollinger_bands(df, bb_period, bb_std_dev)
             # 计算中轨的5日均线，用于判断中轨趋势
-            df[f'SMA_{bb_period}_Middle_Band_SMA_5'] = df['close'].rolling(window=5).mean()
+            df[f'SMA_{bb_period}_Middle_Band_SMA_5'] = cached_indicator('sma', df['close'], symbol=strategy_symbol, period=5)
 
             # 计算MACD
             # EMA for MACD
-            df[f'EMA_Fast_{macd_fast_period}'] = df['close'].ewm(span=macd_fast_period, adjust=False).mean()
-            df[f'EMA_Slow_{macd_slow_period}'] = df['close'].ewm(span=macd_slow_period, adjust=False).mean()
+            df[f'EMA_Fast_{macd_fast_period}'] = cached_indicator('ema', df['close'], symbol=strategy_symbol, span=macd_fast_period)
+            df[f'EMA_Slow_{macd_slow_period}'] = cached_indicator('ema', df['close'], symbol=strategy_symbol, span=macd_slow_period)
             df['MACD'] = df[f'EMA_Fast_{macd_fast_period}'] - df[f'EMA_Slow_{macd_slow_period}']
-            df['Signal'] = df['MACD'].ewm(span=macd_signal_period, adjust=False).mean()
+            df['Signal'] = cached_indicator('ema', df['MACD'], symbol=strategy_symbol, span=macd_signal_period)
             df['Histogram'] = df['MACD'] - df['Signal']
 
             # 计算RSI
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
-            rs = gain / loss
-            df['RSI'] = 100 - (100 / (1 + rs))
+            df['RSI'] = cached_indicator('rsi', df['close'], symbol=strategy_symbol, period=rsi_period)
 
             # Debugging: Display indicators
             st.subheader("调试信息：技术指标")
+            cache_stats = indicator_cache.stats()
+            st.caption(f"指标缓存命中率 {cache_stats['hit_rate']:.0%}（命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}，"
+                       f"占用 {cache_stats['bytes'] / 2**20:.1f} MiB）")
             st.dataframe(df[['close', 'RSI', 'MACD', 'Signal', 'Histogram', f'UpperBB_{bb_period}_{bb_std_dev}', f'LowerBB_{bb_period}_{bb_std_dev}', f'SMA_{bb_period}', f'SMA_{bb_period}_Middle_Band_SMA_5']].tail())
 
             # 3. 策略模拟
@@ -1,8 +1,12 @@
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import streamlit as st # Streamlit is used for displaying results, so it's needed here too
+from symbol_index import US_DAILY_CSV_PATH, read_symbol_rows
+from lazy_import import LazyModule
+from indicator_cache import cached_indicator
+
+go = LazyModule('plotly.graph_objects')
 
 def run_backtest_strategy(
     api,
@@ -45,24 +49,17 @@ def run_backtest_strategy(
     
     stock_data = pd.DataFrame()
     try:
-        all_us_stock_data = pd.read_csv('us2_stock_data_temp.csv', encoding='utf-8-sig')
-        all_us_stock_data['日期'] = pd.to_datetime(all_us_stock_data['日期'])
-
-        stock_data = all_us_stock_data[all_us_stock_data['股票代码'] == strategy_symbol].copy()
-        
-        stock_data = stock_data[
-            (stock_data['日期'] >= pd.to_datetime(strategy_start_date)) &
-            (stock_data['日期'] <= pd.to_datetime(strategy_end_date))
-        ]
+        # 通过按股票的字节偏移索引只读取该股票的行
+        stock_data = read_symbol_rows(strategy_symbol, strategy_start_date, strategy_end_date)
         
         if stock_data.empty:
-            st.error(f"在 'us2_stock_data_temp.csv' 中未能找到 {strategy_symbol} 在指定日期范围内的历史数据。")
+            st.error(f"在 '{US_DAILY_CSV_PATH}' 中未能找到 {strategy_symbol} 在指定日期范围内的历史数据。")
             return None, None, None, None, None, None, None, None
     except FileNotFoundError:
-        st.error("未找到 'us2_stock_data_temp.csv' 文件。请确保文件存在。")
+        st.error(f"未找到 '{US_DAILY_CSV_PATH}' 文件。请先用 data_retrieval.py 下载全美股日线。")
         return None, None, None, None, None, None, None, None
     except Exception as e:
-        st.error(f"加载或处理 'us2_stock_data_temp.csv' 文件时发生错误: {e}")
+        st.error(f"加载或处理 '{US_DAILY_CSV_PATH}' 文件时发生错误: {e}")
         return None, None, None, None, None, None, None, None
 
     if stock_data.empty or 'close' not in stock_data.columns:
@@ -75,21 +72,17 @@ def run_backtest_strategy(
 
     # Calculate Bollinger Bands
     df = api._calculate_bollinger_bands(df, bb_period, bb_std_dev)
-    df[f'SMA_{bb_period}_Middle_Band_SMA_5'] = df[f'SMA_{bb_period}'].rolling(window=5).mean() # Corrected to use SMA_bb_period
+    df[f'SMA_{bb_period}_Middle_Band_SMA_5'] = cached_indicator('sma', df[f'SMA_{bb_period}'], symbol=strategy_symbol, period=5) # Corrected to use SMA_bb_period
 
     # Calculate MACD
-    df[f'EMA_Fast_{macd_fast_period}'] = df['close'].ewm(span=macd_fast_period, adjust=False).mean()
-    df[f'EMA_Slow_{macd_slow_period}'] = df['close'].ewm(span=macd_slow_period, adjust=False).mean()
+    df[f'EMA_Fast_{macd_fast_period}'] = cached_indicator('ema', df['close'], symbol=strategy_symbol, span=macd_fast_period)
+    df[f'EMA_Slow_{macd_slow_period}'] = cached_indicator('ema', df['close'], symbol=strategy_symbol, span=macd_slow_period)
     df['MACD'] = df[f'EMA_Fast_{macd_fast_period}'] - df[f'EMA_Slow_{macd_slow_period}']
-    df['Signal'] = df['MACD'].ewm(span=macd_signal_period, adjust=False).mean()
+    df['Signal'] = cached_indicator('ema', df['MACD'], symbol=strategy_symbol, span=macd_signal_period)
     df['Histogram'] = df['MACD'] - df['Signal']
 
     # Calculate RSI
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
+    df['RSI'] = cached_indicator('rsi', df['close'], symbol=strategy_symbol, period=rsi_period)
 
     # Strategy Simulation
     cash = initial_capital
@@ -0,0 +1,248 @@
+"""
+增量技术指标
+每来一根新K线只用 O(1) 时间更新 EMA、RSI（简单均值/Wilder）、布林带（环形缓冲区上的滑动均值/方差）和 MACD，
+不再对整段历史重新计算。
+
+每个指标既可以跟踪单只股票（shape=()，update 传入一个数），也可以同时跟踪一组股票
+（shape=(股票数,)，update 传入等长数组，NaN 表示该股票本次没有新K线，其状态保持不变）。
+snapshot() 返回可 pickle 的状态，restore_indicator() 由它恢复，便于进程重启后继续增量更新。
+
+与 indicators.py 的批量结果一致（输入无缺失值时）：
+    ema = StreamingEMA(span=20); [ema.update(p) for p in closes]  ==  indicators.ema(closes, span=20)
+"""
+
+from typing import Dict, Tuple, Union
+
+import numpy as np
+
+Number = Union[float, np.ndarray]
+
+# 滑动窗口每更新这么多个窗口长度就从缓冲区重新求和一次，避免累计误差
+_RESUM_WINDOWS = 64
+
+
+def _out(values: np.ndarray, shape: tuple) -> Number:
+    return float(values[0]) if shape == () else values.reshape(shape).copy()
+
+
+class StreamingIndicator:
+    """增量指标基类：子类声明构造参数 _params 和需要保存的状态字段 _state_fields"""
+
+    _params: Tuple[str, ...] = ()
+    _state_fields: Tuple[str, ...] = ()
+
+    def __init__(self, shape: tuple = ()):
+        self.shape = tuple(shape)
+        self.size = int(np.prod(self.shape)) if self.shape else 1
+
+    def _input(self, value) -> np.ndarray:
+        x = np.asarray(value, dtype=np.float64).reshape(-1)
+        if x.size != self.size:
+            raise ValueError(f"输入长度 {x.size} 与指标形状 {self.shape} 不符")
+        return x
+
+    def update(self, value):
+        raise NotImplementedError
+
+    def update_many(self, values):
+        """按时间顺序依次更新（values 的第一维为时间），返回最后一次的结果，用于用历史数据预热"""
+        result = None
+        for value in values:
+            result = self.update(value)
+        return result
+
+    def snapshot(self) -> Dict:
+        """导出当前状态（参数 + 状态数组的副本）"""
+        state = {}
+        for name in self._state_fields:
+            value = getattr(self, name)
+            state[name] = value.snapshot() if isinstance(value, StreamingIndicator) else np.array(value, copy=True)
+        return {
+            'type': type(self).__name__,
+            'params': {name: getattr(self, name) for name in self._params},
+            'shape': self.shape,
+            'state': state,
+        }
+
+
+class RollingWindow(StreamingIndicator):
+    """环形缓冲区上的滑动和/平方和，窗口填满后给出均值与样本方差"""
+
+    _params = ('period',)
+    _state_fields = ('buffer', 'pos', 'count', 'total', 'total_sq', 'updates')
+
+    def __init__(self, period: int, shape: tuple = ()):
+        super().__init__(shape)
+        self.period = period
+        self.buffer = np.zeros((period, self.size))
+        self.pos = np.zeros(self.size, dtype=np.int64)
+        self.count = np.zeros(self.size, dtype=np.int64)
+        self.total = np.zeros(self.size)
+        self.total_sq = np.zeros(self.size)
+        self.updates = np.zeros((), dtype=np.int64)
+
+    def push(self, x: np.ndarray) -> None:
+        idx = np.nonzero(~np.isnan(x))[0]
+        if len(idx) == 0:
+            return
+        pos = self.pos[idx]
+        full = self.count[idx] == self.period
+        old = np.where(full, self.buffer[pos, idx], 0.0)
+        new = x[idx]
+        self.total[idx] += new - old
+        self.total_sq[idx] += new * new - old * old
+        self.buffer[pos, idx] = new
+        self.pos[idx] = (pos + 1) % self.period
+        self.count[idx] = np.minimum(self.count[idx] + 1, self.period)
+        self.updates += 1
+        if self.updates % (self.period * _RESUM_WINDOWS) == 0:
+            filled = np.arange(self.period)[:, None] < self.count[None, :]
+            self.total = np.where(filled, self.buffer, 0.0).sum(axis=0)
+            self.total_sq = np.where(filled, self.buffer * self.buffer, 0.0).sum(axis=0)
+
+    def mean(self) -> np.ndarray:
+        return np.where(self.count == self.period, self.total / self.period, np.nan)
+
+    def std(self, ddof: int = 1) -> np.ndarray:
+        var = (self.total_sq - self.total * self.total / self.period) / (self.period - ddof)
+        return np.where(self.count == self.period, np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+    def update(self, value) -> Number:
+        self.push(self._input(value))
+        return _out(self.mean(), self.shape)
+
+
+class StreamingEMA(StreamingIndicator):
+    """指数移动平均（等价于 ewm(span, adjust=False)，首个值为初值）"""
+
+    _params = ('alpha',)
+    _state_fields = ('value',)
+
+    def __init__(self, span: int = None, alpha: float = None, shape: tuple = ()):
+        super().__init__(shape)
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.value = np.full(self.size, np.nan)
+
+    def push(self, x: np.ndarray) -> np.ndarray:
+        valid = ~np.isnan(x)
+        started = ~np.isnan(self.value)
+        self.value = np.where(valid & started, self.value + self.alpha * (x - self.value),
+                              np.where(valid, x, self.value))
+        return self.value
+
+    def update(self, value) -> Number:
+        return _out(self.push(self._input(value)), self.shape)
+
+
+class StreamingBollinger(StreamingIndicator):
+    """布林带：返回 (中轨, 上轨, 下轨)，窗口未满时为 NaN"""
+
+    _params = ('period', 'std_dev')
+    _state_fields = ('window',)
+
+    def __init__(self, period: int = 20, std_dev: float = 2.0, shape: tuple = ()):
+        super().__init__(shape)
+        self.period = period
+        self.std_dev = std_dev
+        self.window = RollingWindow(period, shape)
+
+    def update(self, value) -> Tuple[Number, Number, Number]:
+        self.window.push(self._input(value))
+        middle = self.window.mean()
+        width = self.std_dev * self.window.std()
+        return _out(middle, self.shape), _out(middle + width, self.shape), _out(middle - width, self.shape)
+
+
+class StreamingRSI(StreamingIndicator):
+    """
+    相对强弱指标
+    method='sma' 为最近 period 个涨跌的简单均值（与 indicators.rsi 默认一致）；
+    method='wilder' 先取前 period 个涨跌的均值，之后 avg = (avg × (period-1) + x) / period
+    每只股票第一根K线的涨跌记为 0
+    """
+
+    _params = ('period', 'method')
+    _state_fields = ('last', 'gains', 'losses', 'avg_gain', 'avg_loss', 'seen')
+
+    def __init__(self, period: int = 14, method: str = 'sma', shape: tuple = ()):
+        super().__init__(shape)
+        if method not in ('sma', 'wilder'):
+            raise ValueError(f"不支持的 RSI 计算方式: {method}")
+        self.period = period
+        self.method = method
+        self.last = np.full(self.size, np.nan)
+        # sma：滑动窗口；wilder：预热期内借用窗口求首个均值
+        self.gains = RollingWindow(period, shape)
+        self.losses = RollingWindow(period, shape)
+        self.avg_gain = np.full(self.size, np.nan)
+        self.avg_loss = np.full(self.size, np.nan)
+        self.seen = np.zeros(self.size, dtype=np.int64)
+
+    def update(self, value) -> Number:
+        x = self._input(value)
+        valid = ~np.isnan(x)
+        delta = np.where(np.isnan(self.last), 0.0, x - self.last)
+        delta = np.where(valid, delta, np.nan)
+        gain = np.where(valid, np.maximum(delta, 0.0), np.nan)
+        loss = np.where(valid, np.maximum(-delta, 0.0), np.nan)
+        self.last = np.where(valid, x, self.last)
+
+        if self.method == 'sma':
+            self.gains.push(gain)
+            self.losses.push(loss)
+            avg_gain, avg_loss = self.gains.mean(), self.losses.mean()
+        else:
+            seeding = valid & (self.seen < self.period)
+            smoothing = valid & (self.seen >= self.period)
+            self.gains.push(np.where(seeding, gain, np.nan))
+            self.losses.push(np.where(seeding, loss, np.nan))
+            p = self.period
+            self.avg_gain = np.where(smoothing, (self.avg_gain * (p - 1) + gain) / p, self.avg_gain)
+            self.avg_loss = np.where(smoothing, (self.avg_loss * (p - 1) + loss) / p, self.avg_loss)
+            self.seen = self.seen + valid
+            seeded = seeding & (self.seen == p)
+            self.avg_gain = np.where(seeded, self.gains.mean(), self.avg_gain)
+            self.avg_loss = np.where(seeded, self.losses.mean(), self.avg_loss)
+            avg_gain, avg_loss = self.avg_gain, self.avg_loss
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        return _out(out, self.shape)
+
+
+class StreamingMACD(StreamingIndicator):
+    """MACD：返回 (MACD线, 信号线, 柱状图)"""
+
+    _params = ('fast', 'slow', 'signal')
+    _state_fields = ('fast_ema', 'slow_ema', 'signal_ema')
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, shape: tuple = ()):
+        super().__init__(shape)
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.fast_ema = StreamingEMA(span=fast, shape=shape)
+        self.slow_ema = StreamingEMA(span=slow, shape=shape)
+        self.signal_ema = StreamingEMA(span=signal, shape=shape)
+
+    def update(self, value) -> Tuple[Number, Number, Number]:
+        x = self._input(value)
+        line = self.fast_ema.push(x) - self.slow_ema.push(x)
+        # 本次没有新K线的股票，信号线保持不变
+        signal_line = self.signal_ema.push(np.where(np.isnan(x), np.nan, line))
+        return _out(line, self.shape), _out(signal_line, self.shape), _out(line - signal_line, self.shape)
+
+
+_INDICATOR_TYPES = {cls.__name__: cls for cls in
+                    (RollingWindow, StreamingEMA, StreamingBollinger, StreamingRSI, StreamingMACD)}
+
+
+def restore_indicator(snapshot: Dict) -> StreamingIndicator:
+    """由 snapshot() 的结果恢复指标对象"""
+    cls = _INDICATOR_TYPES[snapshot['type']]
+    indicator = cls(**snapshot['params'], shape=tuple(snapshot['shape']))
+    for name, value in snapshot['state'].items():
+        if isinstance(value, dict) and 'type' in value:
+            value = restore_indicator(value)
+        else:
+            value = np.array(value, copy=True)
+        setattr(indicator, name, value)
+    return indicator
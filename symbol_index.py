@@ -0,0 +1,146 @@
+"""
+全美股日线CSV的按股票字节偏移索引
+一次扫描记录每只股票所在行的字节区间，保存为同目录下的 .idx.json；
+回测时只 seek 读取目标股票的行，不再解析整个文件。文件只在尾部追加时增量更新索引
+（以 inode 和旧文件末尾一段字节的哈希判断；整体重写、替换后重建）
+"""
+
+import csv
+import hashlib
+import io
+import os
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from local_store import read_json, slice_dates, write_json
+
+# data_retrieval 归并分块后写出的全美股日线文件（回测、面板、基准脚本的默认数据源）
+US_DAILY_CSV_PATH = 'us_stock_data.csv'
+SYMBOL_COL = '股票代码'
+
+# 校验"只在尾部追加"时比对的旧文件末尾字节数
+_TAIL_CHECK_BYTES = 4096
+
+_index_cache: Dict[str, dict] = {}
+_index_lock = threading.Lock()
+
+
+def _index_path(csv_path: str) -> str:
+    return f"{csv_path}.idx.json"
+
+
+def _tail_digest(f, size: int) -> str:
+    """文件前 size 字节中最后 _TAIL_CHECK_BYTES 字节的哈希"""
+    start = max(size - _TAIL_CHECK_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha1(f.read(size - start)).hexdigest()
+
+
+def _stamp(csv_path: str, index: dict) -> None:
+    """记录索引对应文件的 mtime、inode 和末尾字节哈希"""
+    stat = os.stat(csv_path)
+    index['mtime'] = stat.st_mtime
+    index['inode'] = stat.st_ino
+    with open(csv_path, 'rb') as f:
+        index['tail'] = _tail_digest(f, index['size'])
+
+
+def _split_symbol(line: bytes, symbol_pos: int) -> str:
+    text = line.decode('utf-8').rstrip('\r\n')
+    if '"' in text:
+        fields = next(csv.reader([text]))
+    else:
+        fields = text.split(',')
+    return fields[symbol_pos] if symbol_pos < len(fields) else ''
+
+
+def _scan(csv_path: str, index: dict, offset: int) -> None:
+    """从 offset 开始扫描，把每只股票的连续行合并为一个 [start, end) 字节区间"""
+    symbols = index['symbols']
+    symbol_pos = index['symbol_pos']
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        position = offset
+        for line in f:
+            end = position + len(line)
+            if line.strip():
+                symbol = _split_symbol(line, symbol_pos)
+                ranges = symbols.setdefault(symbol, [])
+                if ranges and ranges[-1][1] == position:
+                    ranges[-1][1] = end
+                else:
+                    ranges.append([position, end])
+            position = end
+    index['size'] = position
+
+
+def build_symbol_index(csv_path: str, symbol_col: str = SYMBOL_COL) -> dict:
+    """完整扫描CSV，建立 股票代码 -> 字节区间列表 的索引并落盘"""
+    with open(csv_path, 'rb') as f:
+        header_line = f.readline()
+    header = next(csv.reader([header_line.decode('utf-8-sig').rstrip('\r\n')]))
+    index = {
+        'header': header_line.decode('utf-8-sig'),
+        'symbol_pos': header.index(symbol_col),
+        'symbols': {},
+    }
+    _scan(csv_path, index, len(header_line))
+    _stamp(csv_path, index)
+    write_json(index, _index_path(csv_path))
+    return index
+
+
+def load_symbol_index(csv_path: str, symbol_col: str = SYMBOL_COL) -> dict:
+    """
+    读取索引：文件未变化时直接使用（进程内缓存 + 磁盘 .idx.json）；
+    文件只是在尾部追加了内容（同一 inode、旧内容末尾字节未变、以换行结尾）时仅扫描新增部分；否则重建
+    """
+    stat = os.stat(csv_path)
+    size = stat.st_size
+    with _index_lock:
+        index = _index_cache.get(csv_path) or read_json(_index_path(csv_path))
+        if (index is None or index.get('size', 0) > size
+                or index.get('inode') != stat.st_ino or 'tail' not in index):
+            index = build_symbol_index(csv_path, symbol_col)
+        elif index['size'] < size or index.get('mtime') != stat.st_mtime:
+            with open(csv_path, 'rb') as f:
+                appended_only = index['size'] < size and _tail_digest(f, index['size']) == index['tail']
+                if appended_only:
+                    f.seek(index['size'] - 1)
+                    appended_only = f.read(1) == b'\n'
+            if appended_only:
+                _scan(csv_path, index, index['size'])
+                _stamp(csv_path, index)
+                write_json(index, _index_path(csv_path))
+            else:
+                index = build_symbol_index(csv_path, symbol_col)
+        _index_cache[csv_path] = index
+        return index
+
+
+def read_symbol_rows(symbol: str,
+                     start_date: Optional[str] = None,
+                     end_date: Optional[str] = None,
+                     csv_path: str = US_DAILY_CSV_PATH) -> pd.DataFrame:
+    """
+    只读取某只股票的行（按日期排序并截取区间），文件不存在时抛出 FileNotFoundError
+    """
+    index = load_symbol_index(csv_path)
+    ranges: List[List[int]] = index['symbols'].get(symbol, [])
+    buffer = io.BytesIO()
+    buffer.write(index['header'].encode('utf-8'))
+    with open(csv_path, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
+            buffer.write(f.read(end - start))
+    buffer.seek(0)
+    df = pd.read_csv(buffer, encoding='utf-8', dtype={SYMBOL_COL: str})
+    # 防御索引与文件不一致时读到其他股票的行
+    df = df[df[SYMBOL_COL] == symbol].copy()
+    if df.empty:
+        return df
+    df['日期'] = pd.to_datetime(df['日期'])
+    df = df.drop_duplicates(subset=['日期'], keep='last').sort_values('日期').reset_index(drop=True)
+    return slice_dates(df, start_date, end_date)
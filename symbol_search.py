@@ -0,0 +1,192 @@
+"""
+股票代码/名称搜索索引
+在内存中对 代码、英文名 name、中文名 cname（以及安装 pypinyin 时的拼音/首字母）建立索引：
+- 前缀匹配：所有检索键排序后二分查找（等价于压缩的前缀树）
+- 子串匹配：二元组(bigram)倒排表求交集后再校验
+结果按 代码完全匹配 > 代码前缀 > 名称前缀 > 拼音前缀 > 名称包含 排序，同级按原始顺序（如市值）排序
+"""
+
+import bisect
+import heapq
+import re
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import pandas as pd
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+TICKER_LIST_PATH = 'ticker_list.csv'
+
+# 匹配等级（越小越靠前）
+EXACT, CODE_PREFIX, NAME_PREFIX, PINYIN_PREFIX, CONTAINS = range(5)
+
+# 不超过该长度的查询（单字母、两字母）前缀区间很大，结果按 (查询, 市场, 条数) 缓存
+_SHORT_QUERY_LEN = 2
+
+_HAS_CJK = re.compile(r'[\u4e00-\u9fff]')
+
+
+class SymbolMatch(NamedTuple):
+    code: str
+    name: str
+    cname: str
+    market: str
+    rank: int
+
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class SymbolSearchIndex:
+    """代码/名称检索索引（构建后只读，可在多个会话间共享）"""
+
+    def __init__(self):
+        self.codes: List[str] = []
+        self.names: List[str] = []
+        self.cnames: List[str] = []
+        self.markets: List[str] = []
+        self._seen: Dict[tuple, int] = {}
+        self._entries = []          # (检索键, 等级, 条目序号)
+        self._keys: List[str] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self._haystacks: List[str] = []
+        self._short_results: Dict[tuple, List[SymbolMatch]] = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def add(self, code: str, name: str = '', cname: str = '', market: str = '') -> None:
+        """添加一条记录（同一市场的重复代码被忽略）"""
+        code = str(code).strip().upper()
+        if not code or (market, code) in self._seen:
+            return
+        name = '' if pd.isna(name) else str(name).strip()
+        cname = '' if pd.isna(cname) else str(cname).strip()
+        i = len(self.codes)
+        self._seen[(market, code)] = i
+        self.codes.append(code)
+        self.names.append(name)
+        self.cnames.append(cname)
+        self.markets.append(market)
+
+        self._entries.append((code.lower(), CODE_PREFIX, i))
+        for text in (name, cname):
+            lowered = text.lower()
+            if lowered:
+                self._entries.append((lowered, NAME_PREFIX, i))
+                # 英文名的每个单词开头都可作为前缀（如 "Apple Inc." 可用 inc 检索）
+                for word in lowered.split()[1:]:
+                    self._entries.append((word, NAME_PREFIX, i))
+        chinese = cname if _HAS_CJK.search(cname) else (name if _HAS_CJK.search(name) else '')
+        if lazy_pinyin is not None and chinese:
+            syllables = lazy_pinyin(chinese)
+            self._entries.append((''.join(syllables).lower(), PINYIN_PREFIX, i))
+            self._entries.append((''.join(lazy_pinyin(chinese, style=Style.FIRST_LETTER)).lower(), PINYIN_PREFIX, i))
+
+        haystack = '\n'.join([code.lower(), name.lower(), cname.lower()])
+        self._haystacks.append(haystack)
+        for gram in _bigrams(haystack):
+            self._postings.setdefault(gram, set()).add(i)
+        self._dirty = True
+
+    def add_frame(self, df: pd.DataFrame, code_col: str, name_col: Optional[str] = None,
+                  cname_col: Optional[str] = None, market: str = '') -> None:
+        """批量添加（按 DataFrame 的行序作为同级排序依据）"""
+        if df is None or df.empty or code_col not in df.columns:
+            return
+        empty = [''] * len(df)
+        names = df[name_col].tolist() if name_col in df.columns else empty
+        cnames = df[cname_col].tolist() if cname_col in df.columns else empty
+        for code, name, cname in zip(df[code_col].tolist(), names, cnames):
+            self.add(code, name, cname, market)
+
+    def _build(self) -> None:
+        self._entries.sort()
+        self._keys = [e[0] for e in self._entries]
+        self._short_results = {}
+        self._dirty = False
+
+    def search(self, query: str, market: Optional[str] = None, limit: int = 10) -> List[SymbolMatch]:
+        """
+        检索代码或名称（一两个字母的短查询结果会缓存）
+
+        Args:
+            query: 代码、英文名、中文名或拼音（不区分大小写）
+            market: 只返回该市场的记录，None 表示不限
+            limit: 最多返回条数
+        """
+        q = (query or '').strip().lower()
+        if not q or not self.codes:
+            return []
+        if self._dirty:
+            self._build()
+        if len(q) <= _SHORT_QUERY_LEN:
+            cache_key = (q, market, limit)
+            cached = self._short_results.get(cache_key)
+            if cached is None:
+                cached = self._short_results[cache_key] = self._search(q, market, limit)
+            return list(cached)
+        return self._search(q, market, limit)
+
+    def _search(self, q: str, market: Optional[str], limit: int) -> List[SymbolMatch]:
+        markets = self.markets
+        best: Dict[int, int] = {}
+
+        def consider(i: int, rank: int) -> None:
+            if market is not None and markets[i] != market:
+                return
+            if rank < best.get(i, CONTAINS + 1):
+                best[i] = rank
+
+        # 前缀匹配：检查整个前缀区间（先按市场过滤），再按 (等级, 原始顺序) 取前 limit 条
+        lo = bisect.bisect_left(self._keys, q)
+        hi = bisect.bisect_right(self._keys, q + '\uffff')
+        for key, rank, i in self._entries[lo:hi]:
+            consider(i, EXACT if rank == CODE_PREFIX and key == q else rank)
+
+        # 子串匹配：前缀结果不足时才用二元组倒排表补充
+        if len(best) < limit and len(q) >= 2:
+            postings = [self._postings.get(g) for g in _bigrams(q)]
+            if all(postings):
+                postings.sort(key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+                for i in candidates:
+                    if i not in best and q in self._haystacks[i]:
+                        consider(i, CONTAINS)
+
+        ordered = heapq.nsmallest(limit, best.items(), key=lambda item: (item[1], item[0]))
+        return [SymbolMatch(self.codes[i], self.names[i], self.cnames[i], self.markets[i], rank)
+                for i, rank in ordered]
+
+
+def build_symbol_search_index(ticker_list_path: Optional[str] = TICKER_LIST_PATH,
+                              market_lists: Optional[Dict[str, pd.DataFrame]] = None) -> SymbolSearchIndex:
+    """
+    由美股 ticker_list.csv（按市值排序）和A股市场列表构建索引
+
+    Args:
+        ticker_list_path: 美股列表文件，None 或文件不存在时跳过
+        market_lists: {市场: get_market_list 结果}，列为 代码/名称
+    """
+    index = SymbolSearchIndex()
+    if ticker_list_path:
+        try:
+            tickers = pd.read_csv(ticker_list_path, usecols=['symbol', 'name', 'cname'], dtype=str)
+            index.add_frame(tickers, 'symbol', 'name', 'cname', market='us')
+        except (FileNotFoundError, ValueError) as e:
+            print(f"读取美股列表失败: {e}")
+    for market, df in (market_lists or {}).items():
+        index.add_frame(df, '代码', '名称', market=market)
+    # 构建时就排好序，首次查询不再付出排序开销
+    index._build()
+    return index
+
+
+def format_match(match: SymbolMatch) -> str:
+    """下拉框显示文本，如 'AAPL  Apple Inc. 苹果公司'"""
+    return '  '.join(part for part in (match.code, match.name, match.cname) if part)
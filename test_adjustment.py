@@ -0,0 +1,52 @@
+"""
+本地复权计算的回归测试
+"""
+
+import numpy as np
+import pandas as pd
+
+from adjustment import apply_adjustment, normalize_factors
+
+
+def _raw():
+    return pd.DataFrame({
+        '日期': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-04']),
+        '开盘': [10.0, 10.0, 5.0],
+        '收盘': [10.0, 10.0, 5.0],
+        '最高': [11.0, 10.5, 5.5],
+        '最低': [9.0, 9.5, 4.5],
+        '涨跌额': [0.5, 0.0, -5.0],
+        '涨跌幅': [5.26, 0.0, -50.0],
+        '振幅': [21.0, 10.0, 10.0],
+    })
+
+
+def test_hfq_factors_to_qfq_and_hfq():
+    """A股后复权因子：后复权 = 原价 × h，前复权 = 原价 × h / h_最新；除权日的涨跌幅按复权价重算"""
+    factors = normalize_factors(pd.DataFrame({
+        'date': ['2023-01-01', '2024-01-04'],
+        'hfq_factor': ['1.0', '2.0'],
+    }), 'hfq')
+
+    hfq = apply_adjustment(_raw(), factors, 'hfq', 'hfq')
+    assert list(hfq['收盘']) == [10.0, 10.0, 10.0]
+
+    qfq = apply_adjustment(_raw(), factors, 'hfq', 'qfq')
+    assert list(qfq['收盘']) == [5.0, 5.0, 5.0]
+    assert np.allclose(qfq['涨跌幅'], [5.0 / 4.75 * 100 - 100, 0.0, 0.0])
+    assert np.isclose(qfq['振幅'].iloc[2], 20.0)
+
+
+def test_qfq_factor_with_offset():
+    """us2 前复权因子 (f, c)：前复权 = 原价 × f + c，不修改原始数据"""
+    raw = _raw()
+    factors = normalize_factors(pd.DataFrame({
+        'date': ['2024-01-03'],
+        'qfq_factor': [0.5],
+        'adjust': [1.0],
+    }), 'qfq')
+
+    out = apply_adjustment(raw, factors, 'qfq', 'qfq')
+    # 早于第一个因子日期的K线使用第一个因子
+    assert list(out['收盘']) == [6.0, 6.0, 3.5]
+    assert list(raw['收盘']) == [10.0, 10.0, 5.0]
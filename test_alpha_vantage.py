@@ -0,0 +1,127 @@
+"""
+Alpha Vantage 日内数据请求的回归测试：本地 http.server 充当 Alpha Vantage，
+覆盖 5xx/429 重试、每分钟额度提示后重试、以及按列解析
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import api as api_module
+from api import StockDataAPI
+from providers import DataProvider
+from rate_limiter import TokenBucket
+
+SERIES = {
+    "Meta Data": {"1. Information": "Intraday (15min)"},
+    "Time Series (15min)": {
+        "2024-01-02 10:00:00": {"1. open": "11.0", "2. high": "12.5", "3. low": "10.5",
+                                "4. close": "12.0", "5. volume": "300"},
+        "2024-01-02 09:45:00": {"1. open": "10.0", "2. high": "11.5", "3. low": "9.5",
+                                "4. close": "11.0", "5. volume": "200"},
+    },
+}
+QUOTA_NOTE = {"Note": "Our standard API call frequency is 5 calls per minute and 500 calls per day."}
+
+
+class StubServer:
+    """按顺序返回预设 (状态码, JSON) 响应，并记录收到的查询串"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                status, body = stub.responses.pop(0)
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/query"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def alpha_vantage(monkeypatch):
+    """启动桩服务器，把 Alpha Vantage 地址、密钥和限流器替换为测试用的"""
+    servers = []
+    limiter = TokenBucket(rate=1000.0, cooldown=0.0)
+    monkeypatch.setattr(api_module, 'alpha_api', 'test-key')
+    monkeypatch.setattr(api_module, 'get_rate_limiter', lambda name: limiter)
+
+    def start(responses):
+        stub = StubServer(responses)
+        servers.append(stub)
+        monkeypatch.setattr(api_module, 'ALPHA_VANTAGE_URL', stub.url)
+        return stub, StockDataAPI(store_dir=None, provider=DataProvider('live'))
+
+    yield start
+    for stub in servers:
+        stub.close()
+
+
+@pytest.mark.parametrize('status', [500, 503, 429])
+def test_retries_server_errors_and_throttling(alpha_vantage, status):
+    """5xx 和 429 按退避重试，之后拿到正常数据"""
+    stub, api = alpha_vantage([(status, {}), (status, {}), (200, SERIES)])
+    data = api._alpha_vantage_request({'function': 'TIME_SERIES_INTRADAY'}, backoff=0.0)
+    assert data == SERIES
+    assert len(stub.requests) == 3
+
+
+def test_gives_up_after_max_retries(alpha_vantage):
+    """重试次数用尽后返回 None"""
+    stub, api = alpha_vantage([(502, {})] * 3)
+    assert api._alpha_vantage_request({}, max_retries=2, backoff=0.0) is None
+    assert len(stub.requests) == 3
+
+
+def test_client_error_is_not_retried(alpha_vantage):
+    """除 429 外的 4xx 不重试"""
+    stub, api = alpha_vantage([(404, {}), (200, SERIES)])
+    assert api._alpha_vantage_request({}, backoff=0.0) is None
+    assert len(stub.requests) == 1
+
+
+def test_per_minute_quota_note_is_retried(alpha_vantage):
+    """每分钟额度提示（HTTP 200 + Note）冷却后重试"""
+    stub, api = alpha_vantage([(200, QUOTA_NOTE), (200, SERIES)])
+    assert api._alpha_vantage_request({}, backoff=0.0) == SERIES
+    assert len(stub.requests) == 2
+
+
+def test_daily_quota_note_is_returned(alpha_vantage):
+    """每日额度用尽等提示不重试，原样返回给调用方"""
+    daily = {"Information": "You have reached the daily limit of 25 requests."}
+    stub, api = alpha_vantage([(200, daily)])
+    assert api._alpha_vantage_request({}, backoff=0.0) == daily
+    assert len(stub.requests) == 1
+
+
+def test_intraday_columnar_parse(alpha_vantage):
+    """日内数据按时间升序、数值列为 float64，并带上 API 密钥请求"""
+    stub, api = alpha_vantage([(200, SERIES)])
+    df = api._get_time_series_intraday('IBM', '15min', 'compact')
+    assert list(df.columns) == ['开盘', '最高', '最低', '收盘', '成交量']
+    assert df.index.name == '日期时间'
+    assert df.index.is_monotonic_increasing
+    assert list(df['收盘']) == [11.0, 12.0]
+    assert list(df['成交量']) == [200.0, 300.0]
+    assert all(dtype == 'float64' for dtype in df.dtypes)
+    assert 'apikey=test-key' in stub.requests[0]
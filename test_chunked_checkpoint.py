@@ -0,0 +1,43 @@
+"""
+分块断点存储的回归测试
+"""
+
+import pandas as pd
+
+from chunked_checkpoint import ChunkedCheckpoint
+
+
+def _bars(symbol, dates, close):
+    return pd.DataFrame({'日期': dates, '股票代码': symbol, '收盘': close})
+
+
+def test_consolidate_sorts_and_newest_chunk_wins(tmp_path):
+    """归并结果按 (股票代码, 日期) 排序，重复的 (股票代码, 日期) 取较新分块的行"""
+    checkpoint = ChunkedCheckpoint(str(tmp_path / 'chunks'))
+    checkpoint.write_chunk([_bars('BBB', ['2024-01-02', '2024-01-03'], [1.0, 2.0]),
+                            _bars('AAA', ['2024-01-03'], [5.0])])
+    checkpoint.write_chunk([_bars('BBB', ['2024-01-03', '2024-01-04'], [20.0, 30.0])])
+
+    out = str(tmp_path / 'daily.csv')
+    stats = checkpoint.consolidate(out)
+    assert stats == {'symbols': 2, 'rows': 4}
+
+    df = pd.read_csv(out, encoding='utf-8-sig')
+    assert list(zip(df['股票代码'], df['日期'], df['收盘'])) == [
+        ('AAA', '2024-01-03', 5.0),
+        ('BBB', '2024-01-02', 1.0),
+        ('BBB', '2024-01-03', 20.0),
+        ('BBB', '2024-01-04', 30.0),
+    ]
+
+
+def test_manifest_survives_reopen(tmp_path):
+    """manifest 记录已完成股票及覆盖范围，重新打开后可续传"""
+    root = str(tmp_path / 'chunks')
+    ChunkedCheckpoint(root).write_chunk([_bars('AAA', ['2024-01-02', '2024-01-05'], [1.0, 2.0])])
+
+    reopened = ChunkedCheckpoint(root)
+    assert reopened.exists()
+    assert reopened.completed_symbols() == {'AAA'}
+    entry = reopened.manifest['symbols']['AAA']
+    assert (entry['first'], entry['last'], entry['rows']) == ('2024-01-02', '2024-01-05', 2)
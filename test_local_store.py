@@ -0,0 +1,98 @@
+"""
+本地行情存储读穿逻辑的回归测试（不访问网络，用假的数据源）
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from api import StockDataAPI
+from local_store import missing_ranges
+
+
+class FakeUsProvider:
+    """按自然日生成K线的 stock_us_hist（只认 105.AAPL），记录每次请求的日期区间"""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = False
+
+    def stock_us_hist(self, symbol, period, start_date, end_date, adjust):
+        if self.failing:
+            raise ConnectionError('upstream down')
+        if symbol != '105.AAPL':
+            raise KeyError(symbol)
+        self.calls.append((start_date, end_date))
+        dates = pd.date_range(start_date, end_date, freq='D')
+        close = [100.0 + d.toordinal() % 7 for d in dates]
+        return pd.DataFrame({
+            '日期': dates.strftime('%Y-%m-%d'),
+            '开盘': close, '收盘': close, '最高': close, '最低': close,
+            '成交量': [1000] * len(dates), '成交额': [1e5] * len(dates),
+            '振幅': 0.0, '涨跌幅': 0.0, '涨跌额': 0.0, '换手率': 0.0,
+        })
+
+
+def test_today_only_request_then_range_request(tmp_path):
+    """只请求过当日（未记覆盖区间）后再请求一段区间，前复权不应因覆盖区间为空而失败"""
+    provider = FakeUsProvider()
+    api = StockDataAPI(store_dir=str(tmp_path), provider=provider)
+    today = datetime.now()
+    start = (today - timedelta(days=10)).strftime('%Y-%m-%d')
+    end = today.strftime('%Y-%m-%d')
+
+    first = api.get_stock_data('AAPL', 'us', end, end, adjust='qfq')
+    assert first is not None and len(first) == 1
+
+    second = api.get_stock_data('AAPL', 'us', start, end, adjust='qfq')
+    assert second is not None
+    assert len(second) == 11
+    assert second['日期'].is_unique
+
+
+def test_failed_fetch_is_not_recorded_as_covered(tmp_path):
+    """数据源异常时缺口不能记为已覆盖，恢复后应重新获取"""
+    provider = FakeUsProvider()
+    api = StockDataAPI(store_dir=str(tmp_path), provider=provider)
+
+    january = api.get_stock_data('AAPL', 'us', '2024-01-01', '2024-01-31')
+    assert january is not None and len(january) == 31
+
+    provider.failing = True
+    partial = api.get_stock_data('AAPL', 'us', '2024-01-01', '2024-02-29')
+    assert partial is not None and len(partial) == 31
+
+    provider.failing = False
+    provider.calls.clear()
+    full = api.get_stock_data('AAPL', 'us', '2024-01-01', '2024-02-29')
+    assert provider.calls
+    assert full is not None and len(full) == 60
+
+
+def test_missing_ranges_head_hole_and_tail():
+    """头部、中间空洞、尾部缺口；相邻区间视为连续"""
+    covered = [['20240105', '20240110'], ['20240111', '20240115'], ['20240120', '20240125']]
+    assert missing_ranges(covered, '20240101', '20240131') == [
+        ['20240101', '20240104'], ['20240116', '20240119'], ['20240126', '20240131']]
+    assert missing_ranges(covered, '20240106', '20240114') == []
+    assert missing_ranges([], '20240101', '20240102') == [['20240101', '20240102']]
+    assert missing_ranges([['20231201', '20231231']], '20240101', '20240102') == [['20240101', '20240102']]
+
+
+def test_switching_periods_reuses_daily_bars(tmp_path):
+    """日线请求到当天后切换周线/月线，短时间内不再请求数据源"""
+    provider = FakeUsProvider()
+    api = StockDataAPI(store_dir=str(tmp_path), provider=provider)
+    today = datetime.now()
+    start = (today - timedelta(days=60)).strftime('%Y-%m-%d')
+    end = today.strftime('%Y-%m-%d')
+
+    daily = api.get_stock_data('AAPL', 'us', start, end, period='daily')
+    assert daily is not None and not daily.empty
+    assert provider.calls
+
+    provider.calls.clear()
+    for period in ['weekly', 'monthly', 'weekly', 'daily']:
+        bars = api.get_stock_data('AAPL', 'us', start, end, period=period)
+        assert bars is not None and not bars.empty
+    assert provider.calls == []
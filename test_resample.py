@@ -0,0 +1,51 @@
+"""
+日线合成周线/月线的回归测试
+"""
+
+import numpy as np
+import pandas as pd
+
+from resample import period_start, resample_bars
+
+
+def _daily():
+    dates = pd.to_datetime(['2024-01-29', '2024-01-30', '2024-01-31', '2024-02-01', '2024-02-02', '2024-02-05'])
+    close = [10.0, 11.0, 12.0, 13.0, 14.0, 15.0]
+    return pd.DataFrame({
+        '日期': dates,
+        '开盘': [9.0, 10.0, 11.0, 12.0, 13.0, 14.0],
+        '收盘': close,
+        '最高': [c + 1 for c in close],
+        '最低': [c - 2 for c in close],
+        '成交量': [100, 100, 100, 100, 100, 100],
+        '涨跌额': [1.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+        '涨跌幅': [0.0] * 6,
+    })
+
+
+def test_weekly_bars():
+    """周K线：日期取周内最后一个交易日，开高低收按首/最高/最低/末聚合，成交量求和"""
+    weekly = resample_bars(_daily(), 'weekly')
+    assert list(weekly['日期'].dt.strftime('%Y-%m-%d')) == ['2024-02-02', '2024-02-05']
+    assert list(weekly['开盘']) == [9.0, 14.0]
+    assert list(weekly['收盘']) == [14.0, 15.0]
+    assert list(weekly['最高']) == [15.0, 16.0]
+    assert list(weekly['最低']) == [8.0, 13.0]
+    assert list(weekly['成交量']) == [500, 100]
+    # 涨跌额/涨跌幅按上一周期收盘重新计算（首根用首日 收盘 - 涨跌额）
+    assert list(weekly['涨跌额']) == [5.0, 1.0]
+    assert np.allclose(weekly['涨跌幅'], [5.0 / 9.0 * 100, 1.0 / 14.0 * 100])
+    assert list(weekly.columns) == list(_daily().columns)
+
+
+def test_monthly_bars_and_period_start():
+    """月K线按自然月切分；daily 原样返回；period_start 给出所在周/月的第一天"""
+    monthly = resample_bars(_daily(), 'monthly')
+    assert list(monthly['日期'].dt.strftime('%Y-%m-%d')) == ['2024-01-31', '2024-02-05']
+    assert list(monthly['收盘']) == [12.0, 15.0]
+    assert list(monthly['涨跌额']) == [3.0, 3.0]
+
+    assert period_start('20240201', 'weekly') == '20240129'
+    assert period_start('20240215', 'monthly') == '20240201'
+    daily = _daily()
+    assert resample_bars(daily, 'daily') is daily
@@ -0,0 +1,42 @@
+"""
+按股票字节偏移索引的回归测试
+"""
+
+import os
+
+from symbol_index import read_symbol_rows
+
+HEADER = '日期,股票代码,收盘\n'
+
+
+def _write(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER + ''.join(f"{d},{s},{c}\n" for d, s, c in rows))
+
+
+def test_append_is_scanned_incrementally(tmp_path):
+    """尾部追加后能读到新增的行"""
+    path = str(tmp_path / 'daily.csv')
+    _write(path, [('2024-01-02', 'AAA', 1.0), ('2024-01-02', 'BBB', 2.0)])
+    assert len(read_symbol_rows('AAA', csv_path=path)) == 1
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('2024-01-03,AAA,1.5\n')
+    assert list(read_symbol_rows('AAA', csv_path=path)['收盘']) == [1.0, 1.5]
+
+
+def test_rewrite_via_replace_rebuilds_index(tmp_path):
+    """整体重写（os.replace）后即便旧长度处恰为换行，也不能沿用旧偏移"""
+    path = str(tmp_path / 'daily.csv')
+    _write(path, [('2024-01-02', 'AAA', 1.0), ('2024-01-02', 'BBB', 2.0)])
+    assert len(read_symbol_rows('BBB', csv_path=path)) == 1
+
+    tmp = path + '.tmp'
+    _write(tmp, [('2024-01-02', 'AAA', 1.0), ('2024-01-02', 'AAB', 9.0),
+                 ('2024-01-02', 'BBB', 2.0), ('2024-01-03', 'BBB', 2.5)])
+    os.replace(tmp, path)
+
+    assert list(read_symbol_rows('AAB', csv_path=path)['收盘']) == [9.0]
+    bbb = read_symbol_rows('BBB', csv_path=path)
+    assert list(bbb['股票代码'].unique()) == ['BBB']
+    assert list(bbb['收盘']) == [2.0, 2.5]
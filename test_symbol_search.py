@@ -0,0 +1,32 @@
+"""
+代码/名称搜索索引的回归测试
+"""
+
+from symbol_search import CODE_PREFIX, EXACT, SymbolSearchIndex, build_symbol_search_index
+
+
+def test_short_query_ranks_whole_prefix_range():
+    """单字母查询按 (等级, 原始顺序) 排序，不受前缀区间内字母序的影响；市场过滤在截断之前"""
+    index = SymbolSearchIndex()
+    index.add('NVDA', 'NVIDIA Corp', market='us')
+    for n in range(1500):
+        index.add(f'NA{n:04d}', market='sh')
+    for n in range(1500):
+        index.add(f'NB{n:04d}', market='us')
+
+    assert index.search('n', limit=3)[0].code == 'NVDA'
+    us = index.search('n', market='us', limit=3)
+    assert [m.code for m in us] == ['NVDA', 'NB0000', 'NB0001']
+    assert all(m.rank == CODE_PREFIX for m in us)
+    # 缓存的短查询结果与首次一致
+    assert index.search('N', market='us', limit=3) == us
+
+
+def test_exact_code_first_and_index_built_eagerly(tmp_path):
+    """代码完全匹配排在最前；build_symbol_search_index 返回时已完成排序"""
+    path = tmp_path / 'tickers.csv'
+    path.write_text('symbol,name,cname\nMSFT,Microsoft,微软\nMS,Morgan Stanley,摩根士丹利\n', encoding='utf-8')
+    index = build_symbol_search_index(str(path))
+    assert not index._dirty
+    matches = index.search('ms')
+    assert [(m.code, m.rank) for m in matches] == [('MS', EXACT), ('MSFT', CODE_PREFIX)]